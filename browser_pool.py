@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Pool of long-lived browser-use Browsers for mytaxdc_agent.
+Each run borrows an already-launched browser instead of paying Chromium
+cold-start. Browsers are launched on demand, only when every existing one
+is busy, up to the pool size; the browser is reset to a single blank tab with no cookies
+when it is handed back, and relaunched after MAX_USES runs.
+
+When a profile_dir is given, every pool slot launches a persistent context
+on its own user_data_dir, so Chromium's HTTP cache (the site's JS/CSS)
+survives both relaunches and process restarts.
+
+When PW_WS_ENDPOINT is set (e.g. a `npx playwright run-server --port 3000`
+sidecar), slots connect to that long-lived browser server instead of
+launching Chromium locally; each slot gets its own context on the shared
+browser, and profiles are not used.
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from browser_use import Browser, BrowserConfig
+
+logger = logging.getLogger(__name__)
+
+# Pool sizing (overridable via env)
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))
+WS_ENDPOINT = os.getenv("PW_WS_ENDPOINT") or None
+
+
+class BrowserPool:
+    """Queue of up to `size` lazily launched browsers, recycled after max_uses runs."""
+
+    def __init__(
+        self,
+        headless: bool,
+        downloads_path: Optional[Path] = None,
+        profile_dir: Optional[Path] = None,
+        warm_url: Optional[str] = None,
+        size: int = POOL_SIZE,
+        max_uses: int = MAX_USES,
+        ws_endpoint: Optional[str] = WS_ENDPOINT,
+    ):
+        self.headless = headless
+        self.downloads_path = downloads_path
+        # A remote browser server owns its contexts, so persistent profiles don't apply
+        self.profile_dir = profile_dir if not ws_endpoint else None
+        self.ws_endpoint = ws_endpoint
+        self.warm_url = warm_url
+        self.size = size
+        self.max_uses = max_uses
+        self._queue: Optional[asyncio.Queue] = None
+        self._uses: Dict[int, int] = {}
+        self._slots: Dict[int, int] = {}
+        # Slot numbers not yet backed by a browser; popped on launch, pushed back on failure
+        self._free_slots: List[int] = list(reversed(range(size)))
+
+    def _config(self, slot: int) -> BrowserConfig:
+        # One user_data_dir per slot: Chromium locks a profile to a single process
+        user_data_dir = self.profile_dir.with_name(f"{self.profile_dir.name}-{slot}") if self.profile_dir else None
+        return BrowserConfig(
+            headless=self.headless,
+            keep_alive=True,  # agent.run() must not close a pooled browser
+            save_downloads_path=str(self.downloads_path) if self.downloads_path else None,
+            user_data_dir=str(user_data_dir) if user_data_dir else None,
+        )
+
+    async def _launch(self, slot: int) -> Browser:
+        config = self._config(slot)
+        cold = config.user_data_dir is not None and not Path(config.user_data_dir).exists()
+        browser = self._new_browser(config)
+        await browser.start()
+        self._uses[id(browser)] = 0
+        self._slots[id(browser)] = slot
+        if cold and self.warm_url:
+            await self._warm(browser)
+        return browser
+
+    def _new_browser(self, config: BrowserConfig) -> Browser:
+        if self.ws_endpoint:
+            # browser-use connects via playwright.chromium.connect() and opens a fresh context
+            return Browser(config=config, wss_url=self.ws_endpoint)
+        return Browser(config=config)
+
+    async def _warm(self, browser: Browser) -> None:
+        """Load the target site once so a new profile's disk cache holds its static assets."""
+        try:
+            page = await browser.get_current_page()
+            await page.goto(self.warm_url, wait_until="networkidle", timeout=120_000)
+            logger.info("[pool] Warmed profile cache from %s", self.warm_url)
+        except Exception as e:
+            logger.debug("[pool] cache warm-up failed (non-fatal): %s", e)
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+
+    async def _grow(self) -> Browser:
+        """Launch the browser for one unused slot (the pool is below size and nothing is idle)."""
+        slot = self._free_slots.pop()
+        try:
+            browser = await self._launch(slot)
+        except Exception:
+            self._free_slots.append(slot)
+            raise
+        where = f"remote {self.ws_endpoint}" if self.ws_endpoint else f"headless={self.headless}"
+        logger.info("[pool] Launched browser %d/%d (%s)", self.size - len(self._free_slots), self.size, where)
+        return browser
+
+    async def _reset(self, browser: Browser) -> None:
+        """Leave exactly one fresh tab and no cookies, so handlers and sessions don't leak between runs."""
+        context = browser.browser_context
+        fresh = await context.new_page()
+        for page in list(context.pages):
+            if page is not fresh:
+                await page.close()
+        await context.clear_cookies()
+
+    async def acquire(self) -> Browser:
+        """Borrow a launched browser; pair every acquire with release()."""
+        self._ensure_started()
+        if self._queue.empty() and self._free_slots:
+            browser = await self._grow()
+        else:
+            browser = await self._queue.get()
+        self._uses[id(browser)] = self._uses.get(id(browser), 0) + 1
+        return browser
+
+    async def release(self, browser: Browser) -> None:
+        """Hand a browser back, resetting it or replacing it once it is worn out."""
+        worn_out = self._uses.get(id(browser), 0) >= self.max_uses
+        if not worn_out:
+            try:
+                await self._reset(browser)
+            except Exception as e:
+                logger.warning("[pool] reset failed, relaunching browser: %s", e)
+                worn_out = True
+
+        if worn_out:
+            logger.info("[pool] Relaunching pooled browser")
+            self._uses.pop(id(browser), None)
+            slot = self._slots.pop(id(browser), 0)
+            try:
+                await browser.kill()
+            except Exception as e:
+                logger.debug("[pool] browser kill failed: %s", e)
+            try:
+                browser = await self._launch(slot)
+            except Exception as e:
+                # Keep the pool at size; browser-use starts the browser lazily on next use
+                logger.warning("[pool] relaunch failed: %s", e)
+                browser = self._new_browser(self._config(slot))
+                self._uses[id(browser)] = 0
+                self._slots[id(browser)] = slot
+        self._queue.put_nowait(browser)
+
+    async def close(self) -> None:
+        """Kill every idle browser in the pool."""
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            browser = self._queue.get_nowait()
+            try:
+                await browser.kill()
+            except Exception as e:
+                logger.debug("[pool] browser kill failed: %s", e)
+        self._queue = None
+        self._uses.clear()
+        self._slots.clear()
+        self._free_slots = list(reversed(range(self.size)))
+
+
+_POOLS: Dict[bool, BrowserPool] = {}
+
+
+def get_pool(
+    headless: bool,
+    downloads_path: Optional[Path] = None,
+    profile_dir: Optional[Path] = None,
+    warm_url: Optional[str] = None,
+) -> BrowserPool:
+    """Process-wide pool for the given headless mode (created on first use)."""
+    pool = _POOLS.get(headless)
+    if pool is None:
+        pool = _POOLS[headless] = BrowserPool(
+            headless=headless,
+            downloads_path=downloads_path,
+            profile_dir=profile_dir,
+            warm_url=warm_url,
+        )
+    return pool
@@ -4,13 +4,155 @@ Standalone PDF downloader that takes a URL and downloads it to a specified path.
 Can be called from the main script or run independently.
 """
 import argparse
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
 import sys
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse
 
+logger = logging.getLogger(__name__)
 
-def download_pdf(url: str, output_path: str, timeout: int = 60) -> bool:
+# Read size for the streaming loop; large chunks keep the per-byte Python overhead low
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Files at least this large are fetched as parallel byte ranges when the server allows it
+RANGED_MIN_SIZE = 4 * 1024 * 1024
+RANGED_PARTS = 4
+
+# Bodies up to this size skip the chunked read loop entirely
+SMALL_BODY_MAX = 2 * 1024 * 1024
+
+_PDF_MAGIC = b'%PDF-'
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+# Headers to mimic browser request
+_BASE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/pdf,application/octet-stream,*/*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    # PDFs are already compressed; asking for identity keeps decoding out of the hot path
+    'Accept-Encoding': 'identity',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+_DC_HOST = 'mytax.dc.gov'
+_DC_REFERER = 'https://mytax.dc.gov/_/'
+
+
+def _build_session() -> requests.Session:
+    """Shared session so repeat downloads reuse pooled keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(
+            total=5,
+            connect=3,
+            read=3,
+            status=3,
+            backoff_factor=0.3,
+            status_forcelist=(408, 429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+        ),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_SESSION = _build_session()
+
+
+def _discard(output_path: str) -> None:
+    """Remove a partial download so callers never see a corrupt file."""
+    try:
+        os.unlink(output_path)
+    except OSError:
+        pass
+
+
+def _map_output(fd: int, size: int) -> Optional[mmap.mmap]:
+    """Size the file and map it for writing, or None where mapping isn't supported."""
+    try:
+        os.ftruncate(fd, size)
+        return mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)
+    except (OSError, ValueError):
+        return None
+
+
+def _copy_into_map(mapped: mmap.mmap, head: bytes, raw, chunk_size: int, digest) -> int:
+    """Copy the response body into the mapping; the kernel flushes pages lazily."""
+    size = len(mapped)
+    mapped[:len(head)] = head
+    total = len(head)
+    while total < size:
+        data = raw.read(min(chunk_size, size - total))
+        if not data:
+            break
+        mapped[total:total + len(data)] = data
+        total += len(data)
+        if digest:
+            digest.update(data)
+    return total
+
+
+class _RangeNotHonored(IOError):
+    """The server advertised Accept-Ranges but answered a Range request without a 206."""
+
+
+def _fetch_range(session: requests.Session, url: str, output_path: str, headers: dict, timeout: int,
+                 lo: int, hi: int, chunk_size: int) -> None:
+    """Download bytes lo..hi (inclusive) into the matching slice of output_path."""
+    part_headers = {**headers, 'Range': f'bytes={lo}-{hi}'}
+    response = session.get(url, headers=part_headers, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise _RangeNotHonored(f"Server ignored Range request for bytes {lo}-{hi}")
+        raw = response.raw
+        offset = lo
+        with open(output_path, 'r+b') as f:
+            f.seek(lo)
+            while True:
+                data = raw.read(chunk_size)
+                if not data:
+                    break
+                f.write(data)
+                offset += len(data)
+        if offset != hi + 1:
+            raise IOError(f"Range {lo}-{hi} ended early at byte {offset}")
+    finally:
+        response.close()
+
+
+def _ranged_download(session: requests.Session, url: str, output_path: str, headers: dict, timeout: int, size: int,
+                     num_parts: int = RANGED_PARTS, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Fetch a file of known size as num_parts concurrent byte-range requests."""
+    # Pre-size the file so each worker can write its own slice in place
+    with open(output_path, 'wb') as f:
+        f.truncate(size)
+    
+    part = -(-size // num_parts)
+    ranges = [(lo, min(lo + part, size) - 1) for lo in range(0, size, part)]
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [
+            pool.submit(_fetch_range, session, url, output_path, headers, timeout, lo, hi, chunk_size)
+            for lo, hi in ranges
+        ]
+        for future in futures:
+            future.result()
+
+
+def download_pdf(url: str, output_path: str, timeout: int = 60, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 session: Optional[requests.Session] = None, verify_sha256: Optional[str] = None) -> bool:
     """
     Download a PDF from the given URL to the specified path.
     
@@ -18,72 +160,196 @@ def download_pdf(url: str, output_path: str, timeout: int = 60) -> bool:
         url: The PDF URL to download
         output_path: Path where to save the PDF
         timeout: Request timeout in seconds
+        chunk_size: Number of bytes read from the response per iteration
+        session: Session to download with; build one per process and reuse it.
+            Defaults to the module-level pooled session.
+        verify_sha256: Expected hex SHA-256 of the file; hashed while streaming
         
     Returns:
         True if successful, False otherwise
     """
     try:
         # Create output directory if it doesn't exist
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        
-        # Set headers to mimic browser request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/pdf,application/octet-stream,*/*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
         
         # Add Referer for government sites
-        if 'mytax.dc.gov' in url:
-            headers['Referer'] = 'https://mytax.dc.gov/_/'
+        if (urlparse(url).hostname or '').endswith(_DC_HOST):
+            headers = {**_BASE_HEADERS, 'Referer': _DC_REFERER}
+        else:
+            headers = _BASE_HEADERS
         
-        print(f"Downloading PDF from: {url}")
-        print(f"Saving to: {output_path}")
+        logger.info("Downloading PDF %s -> %s", url, output_path)
         
-        # Download the PDF
-        response = requests.get(url, headers=headers, timeout=timeout, stream=True)
-        response.raise_for_status()
-        
-        # Check if response is actually a PDF
-        content_type = response.headers.get('content-type', '').lower()
-        if 'application/pdf' not in content_type and 'application/octet-stream' not in content_type:
-            print(f"Warning: Content-Type is '{content_type}', not PDF")
+        session = session or _SESSION
         
-        # Write to file
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        # Download the PDF
+        response = session.get(url, headers=headers, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            
+            # Check if response is actually a PDF
+            content_type = response.headers.get('content-type', '').lower()
+            if 'application/pdf' not in content_type and 'application/octet-stream' not in content_type:
+                logger.warning("Content-Type is '%s', not PDF", content_type)
+            
+            raw = response.raw
+            encoding = response.headers.get('content-encoding')
+            raw.decode_content = bool(encoding)
+            
+            # Large files on servers that accept ranges are split across parallel connections
+            size = int(response.headers.get('content-length') or 0)
+            # Ranged parts arrive out of order, so hashing needs the single stream
+            ranged = (
+                verify_sha256 is None
+                and size >= RANGED_MIN_SIZE
+                and response.headers.get('accept-ranges', '').lower() == 'bytes'
+                and not encoding
+            )
+            
+            # Small bodies of known size are read in one go: one buffer, one write
+            small = 0 < size <= SMALL_BODY_MAX and not encoding
+            if ranged:
+                first_read = len(_PDF_MAGIC)
+            elif small:
+                first_read = size
+            else:
+                first_read = chunk_size
+            
+            # Sniff the magic bytes so HTML error pages never reach the disk
+            head = raw.read(first_read)
+            if not head.startswith(_PDF_MAGIC):
+                logger.error("❌ Response is not a PDF (starts with %r)", head[:16])
+                return False
+            
+            if ranged:
+                response.close()
+                logger.debug("Using %d parallel range requests for %d bytes", RANGED_PARTS, size)
+                try:
+                    _ranged_download(session, url, output_path, headers, timeout, size, chunk_size=chunk_size)
+                    total = size
+                except _RangeNotHonored as e:
+                    # Accept-Ranges was a false promise: start over as one plain stream
+                    _discard(output_path)
+                    logger.warning("%s; falling back to a single stream", e)
+                    ranged = False
+                    response = session.get(url, headers=headers, timeout=timeout, stream=True)
+                    response.raise_for_status()
+                    raw = response.raw
+                    encoding = response.headers.get('content-encoding')
+                    raw.decode_content = bool(encoding)
+                    size = int(response.headers.get('content-length') or 0)
+                    head = raw.read(chunk_size)
+                    if not head.startswith(_PDF_MAGIC):
+                        logger.error("❌ Response is not a PDF (starts with %r)", head[:16])
+                        return False
+                except Exception:
+                    _discard(output_path)
+                    raise
+            
+            if not ranged:
+                digest = hashlib.sha256(head) if verify_sha256 else None
+                # A short body raises mid-stream (urllib3 2.x) after the file was preallocated
+                # to full size, so any failure here must remove the zero-padded file
+                try:
+                    fd = os.open(output_path, _WRITE_FLAGS, 0o644)
+                    try:
+                        mapped = _map_output(fd, size) if size > SMALL_BODY_MAX and not encoding else None
+                        if mapped is not None:
+                            with mapped:
+                                total = _copy_into_map(mapped, head, raw, chunk_size, digest)
+                        else:
+                            # Write to file with sized reads on the underlying urllib3 response,
+                            # straight to an unbuffered fd (the chunks are already large)
+                            if size and not encoding and hasattr(os, 'posix_fallocate'):
+                                os.posix_fallocate(fd, 0, size)
+                            os.write(fd, head)
+                            total = len(head)
+                            while not (small and total == size):
+                                data = raw.read(chunk_size)
+                                if not data:
+                                    break
+                                os.write(fd, data)
+                                total += len(data)
+                                if digest:
+                                    digest.update(data)
+                    finally:
+                        os.close(fd)
+                except Exception:
+                    _discard(output_path)
+                    raise
+                
+                # Content-Length only describes the decoded body when nothing was encoded
+                if size and not encoding and total != size:
+                    logger.error("❌ PDF truncated: got %d of %d bytes", total, size)
+                    _discard(output_path)
+                    return False
+                if digest and digest.hexdigest() != verify_sha256.lower():
+                    logger.error("❌ SHA-256 mismatch: expected %s, got %s", verify_sha256, digest.hexdigest())
+                    _discard(output_path)
+                    return False
+        finally:
+            response.close()
         
-        # Verify file was created and has content
-        if Path(output_path).exists() and Path(output_path).stat().st_size > 0:
-            print(f"✅ PDF downloaded successfully: {Path(output_path).stat().st_size} bytes")
+        # Verify we actually received content
+        if total > 0:
+            logger.info("✅ PDF downloaded successfully: %d bytes", total)
             return True
         else:
-            print("❌ PDF file was not created or is empty")
+            logger.error("❌ PDF file was not created or is empty")
             return False
             
     except requests.exceptions.RequestException as e:
-        print(f"❌ Network error downloading PDF: {e}")
+        logger.error("❌ Network error downloading PDF: %s", e)
         return False
     except Exception as e:
-        print(f"❌ Error downloading PDF: {e}")
+        logger.error("❌ Error downloading PDF: %s", e)
         return False
 
 
+async def download_pdf_async(url: str, output_path: str, timeout: int = 60,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE,
+                             session: Optional[requests.Session] = None,
+                             verify_sha256: Optional[str] = None) -> bool:
+    """Awaitable download_pdf; the blocking transfer runs in a worker thread."""
+    return await asyncio.to_thread(download_pdf, url, output_path, timeout, chunk_size, session,
+                                   verify_sha256)
+
+
+async def download_many(jobs: List[Tuple[str, str]], concurrency: int = 5, timeout: int = 60,
+                        session: Optional[requests.Session] = None) -> List[bool]:
+    """
+    Download several (url, output_path) pairs concurrently.
+    
+    Args:
+        jobs: Pairs of PDF URL and destination path
+        concurrency: Maximum number of downloads in flight
+        timeout: Request timeout in seconds for each download
+        session: Session shared by every download (defaults to the module session)
+        
+    Returns:
+        One success flag per job, in input order
+    """
+    sem = asyncio.Semaphore(concurrency)
+    
+    async def bound(url: str, output_path: str) -> bool:
+        async with sem:
+            return await download_pdf_async(url, output_path, timeout, session=session)
+    
+    return await asyncio.gather(*(bound(url, output_path) for url, output_path in jobs))
+
+
 def main():
     parser = argparse.ArgumentParser(description="Download a PDF from a URL")
     parser.add_argument("url", help="PDF URL to download")
     parser.add_argument("output", help="Output file path")
     parser.add_argument("--timeout", type=int, default=60, help="Request timeout in seconds")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Read size in bytes")
+    parser.add_argument("--sha256", help="Expected SHA-256 hex digest of the PDF")
     
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
-    success = download_pdf(args.url, args.output, args.timeout)
+    success = download_pdf(args.url, args.output, args.timeout, args.chunk_size, verify_sha256=args.sha256)
     sys.exit(0 if success else 1)
 
 
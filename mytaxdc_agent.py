@@ -1,14 +1,15 @@
 import argparse
 import asyncio
-import json
 import logging
 import os
 import re
 import time
-from dataclasses import dataclass, asdict
+import weakref
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Literal, Optional
+from typing import Iterable, List, Literal, Optional
 
+import orjson
 from dotenv import load_dotenv
 
 from browser_use import (
@@ -16,15 +17,16 @@ from browser_use import (
     Controller,
     ActionResult,
     Browser,
-    BrowserConfig,
-    BrowserContextConfig,
 )
 from langchain_openai import ChatOpenAI
 from playwright.async_api import Page
 
+from browser_pool import get_pool
+
 # ---------------------------
 # Configuration & Logging
 # ---------------------------
+# Every output file is a direct child of ARTIFACTS_DIR, so this is the only mkdir needed
 ARTIFACTS_DIR = Path(__file__).parent / "artifacts"
 ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -32,13 +34,26 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s | %(levelname)s | %(message)s")
 logger = logging.getLogger(__name__)
 
+# Persistent Chromium profiles (one per pooled browser) keep mytax.dc.gov's static assets cached.
+# They hold session cookies, so they live outside the served artifacts directory.
+PROFILE_DIR = Path(os.getenv("PW_PROFILE_DIR") or Path(__file__).parent / ".cache" / "pw-profile")
+MYTAX_URL = "https://mytax.dc.gov/_/"
+
+# Result panel on the Clean Hands search page (scanned instead of the whole body)
+RESULT_SELECTOR = "div.ResultsContainer, section[role='main'], #searchResults"
+
+# After the route capture saves a PDF, hand the fetched response back to the page (so the
+# download/response/popup signals still fire) or abort it. Abort only suits headless batch
+# runs that never look at the page and don't rely on those signals.
+RENDER_AFTER_CAPTURE = os.getenv("RENDER_AFTER_CAPTURE", "1").lower() not in ("0", "false", "no")
+
 # Global timeouts (ms)
 NAV_TIMEOUT = 60_000
 LONG_TIMEOUT = 300_000
 SHORT_TIMEOUT = 10_000
 
 
-@dataclass
+@dataclass(slots=True)
 class WorkflowResult:
     status: Literal["compliant", "noncompliant", "unknown"]
     message: str
@@ -49,87 +64,97 @@ class WorkflowResult:
     last4: str
 
     def to_json(self) -> str:
-        return json.dumps(asdict(self), ensure_ascii=False)
+        # orjson serializes dataclasses natively (no asdict copy) and emits UTF-8
+        return orjson.dumps(self).decode()
 
 
 controller = Controller()
 
+# ---------------------------
+# Precompiled patterns
+# ---------------------------
+# URLs that serve the certificate: plain .pdf links and GenTax /Retrieve/...?file__= downloads
+_PDF_URL_RE = re.compile(r"\.pdf(?:$|\?)|/retrieve/.*file__=", re.I)
+
+# Content types GenTax uses for the certificate (inline and attachment)
+_PDF_CT_SET = frozenset(("application/pdf", "application/octet-stream", "application/force-download"))
+
+# Static assets the automated flow never needs (icons, webfonts, media)
+_HEAVY_ASSET_RE = re.compile(r"\.(?:png|jpe?g|gif|webp|ico|svg|bmp|woff2?|ttf|otf|eot|mp4|webm|mp3|wav)(?:$|\?)", re.I)
+_BLOCKED_RESOURCE_TYPES = frozenset(("image", "font", "media"))
+
+# One pass over the page text: group 1 is set only for "non-compliant" variants
+_STATUS_RE = re.compile(r"\b(non[-\s]?)?compliant\b", re.I)
+
+_START_OVER_RE = re.compile(r"Click\s*Here\s*to\s*Start\s*Over", re.I)
+_VALIDATE_LINK_RE = re.compile(r"Validate.*Clean\s*Hands", re.I)
+_VALIDATE_TEXT_RE = re.compile(r"Validate a Certificate of Clean Hands", re.I)
+_NOTICE_LABEL_RE = re.compile(r"notice\s*number", re.I)
+_NOTICE_PLACEHOLDER_RE = re.compile(r"notice", re.I)
+_LAST4_LABEL_RE = re.compile(r"(last\s*4|last\s*four)", re.I)
+_LAST4_PLACEHOLDER_RE = re.compile(r"last\s*4", re.I)
+_SEARCH_BUTTON_RE = re.compile(r"^Search$", re.I)
+_REQUEST_LINK_RE = re.compile(r"request.*Certificate of Clean Hands", re.I)
+_REQUEST_TEXT_RE = re.compile(r"Click here to request a current Certificate of Clean Hands", re.I)
+_NEXT_BUTTON_RE = re.compile(r"^Next$", re.I)
+_SUBMIT_BUTTON_RE = re.compile(r"Submit", re.I)
+_VIEW_PDF_RE = re.compile(r"view\s*(certificate|notice)", re.I)
+
 # ---------------------------
 # PDF Detection & Utilities
 # ---------------------------
 def _looks_like_pdf_url(url: str) -> bool:
-    u = (url or "").lower()
-    return u.endswith(".pdf") or ("/retrieve/" in u and "file__=" in u)
+    return bool(_PDF_URL_RE.search(url or ""))
 
 
 def _is_pdf_like_headers(ct: Optional[str], url: Optional[str]) -> bool:
     ct = (ct or "").lower()
-    u = (url or "").lower()
-    return (
-        "application/pdf" in ct
-        or "application/octet-stream" in ct
-        or "application/force-download" in ct
-        or _looks_like_pdf_url(u)
-    )
+    return any(s in ct for s in _PDF_CT_SET) or _PDF_URL_RE.search(url or "") is not None
 
 
 def _is_pdf_response(resp) -> bool:
     try:
-        return _is_pdf_like_headers(resp.headers.get("content-type"), getattr(resp, "url", ""))
+        return _is_pdf_like_headers(resp.headers.get("content-type"), resp.url)
     except Exception:
         return False
 
 
-async def _save_resp_pdf(resp, out_path: Path, flag: dict):
-    """Save response bytes once (guard against races)."""
-    if flag.get("saved"):
-        return
-    try:
-        data = await resp.body()
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(out_path, "wb") as f:
-            f.write(data)
-        flag["saved"] = True
-        flag["path"] = str(out_path)
-        logger.info(f"[sniffer] Saved PDF from {resp.url} -> {out_path}")
-    except Exception as e:
-        logger.warning(f"[sniffer] Failed to save PDF: {e}")
+async def _write_pdf(out_path: Path, data: bytes) -> None:
+    """Write PDF bytes off the event loop so concurrent captures don't stall each other."""
+    # One executor hop for open+write+close (aiofiles spent a thread hop on each)
+    await asyncio.get_running_loop().run_in_executor(None, out_path.write_bytes, data)
 
 
-async def harvest_from_pages(pages: List[Page], out_path: Path, state: dict):
-    """Post-run harvest: if any known page shows a PDF URL, fetch bytes via page context."""
+async def harvest_from_pages(pages: Iterable[Page], out_path: Path, state: dict):
+    """Post-run harvest: if any known page shows a PDF URL, fetch bytes via the page's request context."""
     if state.get("saved"):
         return state["path"]
-    for p in pages:
+    for p in list(pages):
         try:
             if _looks_like_pdf_url(getattr(p, "url", "")):
-                logger.info(f"[harvest] Found open PDF tab: {p.url}")
-                bytes_list = await p.evaluate(
-                    """
-                    async () => {
-                        const res = await fetch(window.location.href, { credentials: 'include' });
-                        if (!res.ok) throw new Error('fetch failed ' + res.status);
-                        const ab  = await res.arrayBuffer();
-                        return Array.from(new Uint8Array(ab));
-                    }
-                """
+                logger.info("[harvest] Found open PDF tab: %s", p.url)
+                resp = await p.context.request.get(
+                    p.url,
+                    headers={"Referer": MYTAX_URL},
+                    timeout=LONG_TIMEOUT,
                 )
-                if bytes_list:
-                    out_path.parent.mkdir(parents=True, exist_ok=True)
-                    with open(out_path, "wb") as f:
-                        f.write(bytes(bytes_list))
+                if not resp.ok:
+                    logger.debug("[harvest] GET %s failed: %s", p.url, resp.status)
+                    continue
+                data = await resp.body()
+                if data:
+                    await _write_pdf(out_path, data)
                     state["saved"] = True
                     state["path"] = str(out_path)
-                    logger.info(f"[harvest] Saved PDF -> {out_path}")
+                    logger.info("[harvest] Saved PDF -> %s", out_path)
                     return state["path"]
         except Exception as e:
-            logger.debug(f"[harvest] {e}")
+            logger.debug("[harvest] %s", e)
     return None
 
 
 async def force_download_via_anchor(page: Page, url: str, out_path: Path) -> Optional[str]:
     """Force the browser to download same-origin PDF using <a download>."""
-    out_path.parent.mkdir(parents=True, exist_ok=True)
     try:
         async with page.expect_download(timeout=LONG_TIMEOUT) as dl_info:
             await page.evaluate(
@@ -145,16 +170,15 @@ async def force_download_via_anchor(page: Page, url: str, out_path: Path) -> Opt
             )
         download = await dl_info.value
         await download.save_as(str(out_path))
-        logger.info(f"[force-anchor] Downloaded -> {out_path}")
+        logger.info("[force-anchor] Downloaded -> %s", out_path)
         return str(out_path)
     except Exception as e:
-        logger.debug(f"[force-anchor] failed: {e}")
+        logger.debug("[force-anchor] failed: %s", e)
         return None
 
 
 async def force_download_via_blob(page: Page, url: str, out_path: Path) -> Optional[str]:
     """Fetch to blob, convert to object URL, trigger download; preserves session cookies."""
-    out_path.parent.mkdir(parents=True, exist_ok=True)
     try:
         async with page.expect_download(timeout=LONG_TIMEOUT) as dl_info:
             await page.evaluate(
@@ -176,10 +200,10 @@ async def force_download_via_blob(page: Page, url: str, out_path: Path) -> Optio
             )
         download = await dl_info.value
         await download.save_as(str(out_path))
-        logger.info(f"[force-blob] Downloaded -> {out_path}")
+        logger.info("[force-blob] Downloaded -> %s", out_path)
         return str(out_path)
     except Exception as e:
-        logger.debug(f"[force-blob] failed: {e}")
+        logger.debug("[force-blob] failed: %s", e)
         return None
 
 
@@ -198,8 +222,7 @@ async def download_via_context_request(page: Page, url: str, out_path: Path) ->
     Use Playwright's APIRequestContext (page.context.request) to GET the PDF with
     the same cookies/session as the page, then write bytes to disk.
     """
-    logger.info(f"[context-request] Starting download from: {url}")
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    logger.info("[context-request] Starting download from: %s", url)
     try:
         resp = await page.context.request.get(
             url,
@@ -207,20 +230,19 @@ async def download_via_context_request(page: Page, url: str, out_path: Path) ->
                 "Accept": "application/pdf,application/octet-stream,*/*",
                 "Referer": "https://mytax.dc.gov/_/",
             },
-            timeout=LONG_TIMEOUT / 1000,  # seconds
+            timeout=LONG_TIMEOUT,  # ms, like every other Playwright timeout
         )
-        logger.info(f"[context-request] Response status: {resp.status}")
+        logger.info("[context-request] Response status: %s", resp.status)
         if not resp.ok:
-            logger.warning(f"[context-request] GET {url} failed: {resp.status}")
+            logger.warning("[context-request] GET %s failed: %s", url, resp.status)
             return None
         data = await resp.body()
-        logger.info(f"[context-request] Got {len(data)} bytes")
-        with open(out_path, "wb") as f:
-            f.write(data)
-        logger.info(f"[context-request] Saved -> {out_path}")
+        logger.info("[context-request] Got %d bytes", len(data))
+        await _write_pdf(out_path, data)
+        logger.info("[context-request] Saved -> %s", out_path)
         return str(out_path)
     except Exception as e:
-        logger.warning(f"[context-request] error: {e}")
+        logger.warning("[context-request] error: %s", e)
         return None
 
 # ---------------------------
@@ -230,6 +252,7 @@ async def attach_pdf_route_capture(page: Page, out_path: Path, state: dict):
     """
     Intercept any request that looks like the PDF and persist bytes via route.fetch().
     Works for inline view, streaming, and attachments; also propagates to popups.
+    Only PDF-like URLs are routed, so every other request bypasses Python entirely.
     """
     if getattr(page, "_pdf_route_attached", False):
         return
@@ -240,34 +263,49 @@ async def attach_pdf_route_capture(page: Page, out_path: Path, state: dict):
         if state.get("saved"):
             await route.continue_()
             return
-        if _looks_like_pdf_url(url):
-            try:
-                response = await route.fetch()
-                body = await response.body()
-                # Persist
-                out_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(out_path, "wb") as f:
-                    f.write(body)
-                state["saved"] = True
-                state["path"] = str(out_path)
-                logger.info(f"[route] Saved PDF via route: {out_path} ({len(body)} bytes) from {url}")
-                # Fulfill to let the browser still render it if needed
-                headers = dict(response.headers)
-                await route.fulfill(status=response.status, headers=headers, body=body)
-            except Exception as e:
-                logger.warning(f"[route] error for {url}: {e}")
-                await route.continue_()
-        else:
+        try:
+            response = await route.fetch()
+            body = await response.body()
+            # Persist
+            await _write_pdf(out_path, body)
+            state["saved"] = True
+            state["path"] = str(out_path)
+            logger.info("[route] Saved PDF via route: %s (%d bytes) from %s", out_path, len(body), url)
+            if RENDER_AFTER_CAPTURE:
+                # Driver reuses the fetched response; the body is not sent back through Python
+                await route.fulfill(response=response)
+            else:
+                await route.abort("aborted")
+        except Exception as e:
+            logger.warning("[route] error for %s: %s", url, e)
             await route.continue_()
 
-    await page.route("**/*", handler)
+    await page.route(_PDF_URL_RE, handler)
 
     def on_popup(popup: Page):
         # Attach the same route capture to popups as well
         asyncio.create_task(attach_pdf_route_capture(popup, out_path, state))
 
     page.on("popup", on_popup)
-    logger.info(f"[route] Route capture attached to page id={id(page)}")
+    logger.info("[route] Route capture attached to page id=%s", id(page))
+
+async def block_heavy_resources(context) -> None:
+    """
+    Abort image/font/media requests for every page in the context (popups included).
+    Only asset-like URLs are routed, so documents, XHR and the PDF itself never reach Python.
+    Stylesheets are kept: the agent's visibility checks depend on layout.
+    """
+    if getattr(context, "_heavy_block_attached", False):
+        return
+    setattr(context, "_heavy_block_attached", True)
+
+    async def handler(route, request):
+        if request.resource_type in _BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route(_HEAVY_ASSET_RE, handler)
 
 # ---------------------------
 # Page Interaction Helpers
@@ -279,189 +317,207 @@ async def maybe_click(page: Page, locator) -> bool:
             await locator.first.click(timeout=SHORT_TIMEOUT)
             return True
     except Exception as e:
-        logger.debug(f"maybe_click: {e}")
+        logger.debug("maybe_click: %s", e)
     return False
 
 
+async def preferred_or_fallback(preferred, fallback):
+    """`preferred.first` if it matches anything right now, otherwise the positional fallback."""
+    try:
+        if await preferred.count() > 0:
+            return preferred.first
+    except Exception as e:
+        logger.debug("preferred_or_fallback: %s", e)
+    return fallback
+
+
+async def wait_for_next(page: Page, locator, timeout: int = SHORT_TIMEOUT) -> None:
+    """
+    Settle until `locator` is visible. The page is usually already network-idle before
+    an in-page postback step renders, so idle is no signal here; only the element is.
+    The element may legitimately never appear (optional step), so timeouts are swallowed.
+    """
+    try:
+        await locator.first.wait_for(state="visible", timeout=timeout)
+    except Exception as e:
+        logger.debug("wait_for_next: %s", e)
+
+
 async def save_screenshot(page: Page, dest: Path, enable: bool) -> Optional[str]:
     if not enable:
         return None
     try:
-        dest.parent.mkdir(parents=True, exist_ok=True)
         await page.screenshot(path=str(dest), full_page=True)
         return str(dest)
     except Exception as e:
-        logger.debug(f"save_screenshot failed: {e}")
+        logger.debug("save_screenshot failed: %s", e)
         return None
 
 
 async def handle_security_warning(page: Page) -> None:
     try:
-        elements = [
-            page.get_by_role("link", name=re.compile(r"Click\s*Here\s*to\s*Start\s*Over", re.I)),
-            page.get_by_text(re.compile(r"Click\s*Here\s*to\s*Start\s*Over", re.I), exact=False),
-        ]
-        for el in elements:
-            if await maybe_click(page, el):
-                await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-                break
+        start_over = page.get_by_role("link", name=_START_OVER_RE).or_(page.get_by_text(_START_OVER_RE, exact=False))
+        if await maybe_click(page, start_over):
+            await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
     except Exception as e:
-        logger.debug(f"No security warning handled (ok): {e}")
+        logger.debug("No security warning handled (ok): %s", e)
 
 
 def detect_status_from_text(text: str) -> Literal["compliant", "noncompliant", "unknown"]:
-    if re.search(r"\bnon[-\s]?compliant\b", text, re.I):
-        return "noncompliant"
-    if re.search(r"\bcompliant\b", text, re.I):
-        return "compliant"
-    return "unknown"
+    status = "unknown"
+    for m in _STATUS_RE.finditer(text):
+        if m.group(1):
+            return "noncompliant"
+        status = "compliant"
+    return status
+
+
+async def read_result_text(page: Page) -> Optional[str]:
+    """Text of the search-result container, falling back to the whole body if it isn't there."""
+    try:
+        container = page.locator(RESULT_SELECTOR)
+        if await container.count() > 0:
+            return await container.first.text_content(timeout=SHORT_TIMEOUT)
+    except Exception as e:
+        logger.debug("read_result_text: %s", e)
+    return await page.text_content("body", timeout=NAV_TIMEOUT)
 
 
 async def click_validate_link(page: Page) -> None:
-    candidates = [
-        page.get_by_role("link", name=re.compile(r"Validate.*Clean\s*Hands", re.I)),
-        page.get_by_text(re.compile(r"Validate a Certificate of Clean Hands", re.I), exact=False),
-        page.locator("a:has-text('Validate a Certificate of Clean Hands')"),
-    ]
-    for loc in candidates:
-        if await maybe_click(page, loc):
-            await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-            return
-    raise RuntimeError("Could not find the 'Validate a Certificate of Clean Hands' link.")
+    link = (
+        page.get_by_role("link", name=_VALIDATE_LINK_RE)
+        .or_(page.get_by_text(_VALIDATE_TEXT_RE, exact=False))
+        .or_(page.locator("a:has-text('Validate a Certificate of Clean Hands')"))
+    )
+    try:
+        await link.first.click(timeout=NAV_TIMEOUT)
+    except Exception as e:
+        raise RuntimeError("Could not find the 'Validate a Certificate of Clean Hands' link.") from e
+    await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
 
 
 async def fill_form_and_search(page: Page, notice: str, last4: str) -> None:
-    field_candidates = [
-        page.get_by_label(re.compile(r"notice\s*number", re.I)),
-        page.get_by_placeholder(re.compile(r"notice", re.I)),
-        page.locator("input").nth(0),
-    ]
-    last4_candidates = [
-        page.get_by_label(re.compile(r"(last\s*4|last\s*four)", re.I)),
-        page.get_by_placeholder(re.compile(r"last\s*4", re.I)),
-        page.locator("input").nth(1),
-    ]
+    # Label/placeholder matches are merged into one locator; the positional input is the
+    # fallback only when neither is on the page. Only visible inputs count: hidden ASP.NET
+    # fields (__VIEWSTATE) come first in the DOM.
+    notice_preferred = page.get_by_label(_NOTICE_LABEL_RE).or_(page.get_by_placeholder(_NOTICE_PLACEHOLDER_RE))
+    # Wait once for the form to render, so the short fill timeouts below only cover the fill
+    try:
+        await notice_preferred.or_(page.locator("input:visible")).first.wait_for(state="visible", timeout=NAV_TIMEOUT)
+    except Exception as e:
+        logger.debug("Form wait timed out, using positional fallback: %s", e)
+    notice_field = await preferred_or_fallback(notice_preferred, page.locator("input:visible").nth(0))
+    last4_field = await preferred_or_fallback(
+        page.get_by_label(_LAST4_LABEL_RE).or_(page.get_by_placeholder(_LAST4_PLACEHOLDER_RE)),
+        page.locator("input:visible").nth(1),
+    )
 
-    for loc in field_candidates:
-        try:
-            await loc.fill(notice, timeout=LONG_TIMEOUT)
-            break
-        except Exception:
-            continue
-    else:
-        raise RuntimeError("Could not fill the Notice Number field.")
+    try:
+        await notice_field.fill(notice, timeout=SHORT_TIMEOUT)
+    except Exception as e:
+        raise RuntimeError("Could not fill the Notice Number field.") from e
 
-    for loc in last4_candidates:
-        try:
-            await loc.click(timeout=LONG_TIMEOUT)
-            await loc.fill(last4, timeout=LONG_TIMEOUT)
-            break
-        except Exception:
-            continue
-    else:
-        raise RuntimeError("Could not fill the Last 4 field.")
+    try:
+        await last4_field.click(timeout=SHORT_TIMEOUT)
+        await last4_field.fill(last4, timeout=SHORT_TIMEOUT)
+    except Exception as e:
+        raise RuntimeError("Could not fill the Last 4 field.") from e
 
-    if not await maybe_click(page, page.get_by_role("button", name=re.compile(r"^Search$", re.I))):
-        if not await maybe_click(page, page.locator('button:has-text("Search"), input[type="submit"][value*="Search" i]')):
-            await last4_candidates[-1].press("Enter")
+    search_button = page.get_by_role("button", name=_SEARCH_BUTTON_RE).or_(
+        page.locator('button:has-text("Search"), input[type="submit"][value*="Search" i]')
+    )
+    if not await maybe_click(page, search_button):
+        await last4_field.press("Enter")
 
 
 async def request_current_certificate(page: Page) -> None:
-    req_link_candidates = [
-        page.get_by_role("link", name=re.compile(r"request.*Certificate of Clean Hands", re.I)),
-        page.get_by_text(re.compile(r"Click here to request a current Certificate of Clean Hands", re.I), exact=False),
-    ]
-    for loc in req_link_candidates:
-        if await maybe_click(page, loc):
-            await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-            break
+    req_link = page.get_by_role("link", name=_REQUEST_LINK_RE).or_(page.get_by_text(_REQUEST_TEXT_RE, exact=False))
+    if await maybe_click(page, req_link):
+        await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
     else:
         logger.info("Request link not found; continuing.")
         return
 
-    await page.wait_for_timeout(1000)
-    if await maybe_click(page, page.get_by_role("button", name=re.compile(r"^Next$", re.I))):
+    next_button = page.get_by_role("button", name=_NEXT_BUTTON_RE)
+    await wait_for_next(page, next_button)
+    if await maybe_click(page, next_button):
         await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-    await page.wait_for_timeout(1000)
-    if await maybe_click(page, page.get_by_role("button", name=re.compile(r"Submit", re.I))):
+    submit_button = page.get_by_role("button", name=_SUBMIT_BUTTON_RE)
+    await wait_for_next(page, submit_button)
+    if await maybe_click(page, submit_button):
         await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
 
 
-async def fetch_certificate_pdf(page: Page, out_path: Path) -> Optional[str]:
-    """
-    Deterministic fetch from the page:
-      1) expect_download (attachment)
-      2) expect_response & resp.body() on same tab (inline)
-      3) popup -> fetch(window.location.href) (inline)
-    """
-    candidates = [
-        page.get_by_role("link", name=re.compile(r"view\s*(certificate|notice)", re.I)),
-        page.get_by_text(re.compile(r"view\s*(certificate|notice)", re.I), exact=False),
-        page.locator("a:has-text('View Certificate')"),
-        page.locator("a:has-text('View Notice')"),
-    ]
-
-    link = None
-    for loc in candidates:
-        try:
-            if await loc.count() > 0:
-                link = loc.first
-                break
-        except Exception:
-            continue
-    if link is None:
-        return None
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    # Strategy 1: native download
+async def _persist_pdf_signal(kind: str, value, out_path: Path) -> Optional[str]:
+    """Save the PDF carried by a download, a same-tab response, or a popup page."""
     try:
-        async with page.expect_download(timeout=LONG_TIMEOUT) as dl_info:
-            await link.click()
-        download = await dl_info.value
-        await download.save_as(str(out_path))
-        logger.info(f"PDF downloaded via native download: {out_path}")
+        if kind == "download":
+            await value.save_as(str(out_path))
+            logger.info("PDF downloaded via native download: %s", out_path)
+        elif kind == "response":
+            logger.info("PDF response: %s (content-type: %s)", value.url, value.headers.get("content-type"))
+            await _write_pdf(out_path, await value.body())
+            logger.info("PDF saved via same-tab response: %s", out_path)
+        else:
+            await value.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
+            resp = await value.context.request.get(
+                value.url,
+                headers={"Referer": MYTAX_URL},
+                timeout=LONG_TIMEOUT,
+            )
+            data = await resp.body() if resp.ok else None
+            if not data:
+                return None
+            await _write_pdf(out_path, data)
+            logger.info("PDF saved via popup request: %s", out_path)
         return str(out_path)
-    except Exception:
-        pass
+    except Exception as e:
+        logger.debug("[fetch] %s capture failed: %s", kind, e)
+        return None
 
-    # Strategy 2: same-tab response bytes
-    try:
-        async with page.expect_response(lambda r: _is_pdf_response(r), timeout=LONG_TIMEOUT) as resp_info:
-            await link.click()
-        resp = await resp_info.value
-        logger.info(f"PDF response: {resp.url} (content-type: {resp.headers.get('content-type')})")
-        data = await resp.body()
-        with open(out_path, "wb") as f:
-            f.write(data)
-        logger.info(f"PDF saved via same-tab response: {out_path}")
-        return str(out_path)
-    except Exception:
-        pass
 
-    # Strategy 3: popup page -> fetch
+async def fetch_certificate_pdf(page: Page, out_path: Path) -> Optional[str]:
+    """
+    Deterministic fetch from the page. One click, with all three signals raced:
+      - download (attachment)
+      - PDF response on the same tab (inline)
+      - popup -> context.request.get(popup.url) (inline)
+    The first signal that yields bytes wins; a failed one falls through to the others.
+    """
+    link = (
+        page.get_by_role("link", name=_VIEW_PDF_RE)
+        .or_(page.get_by_text(_VIEW_PDF_RE, exact=False))
+        .or_(page.locator("a:has-text('View Certificate'), a:has-text('View Notice')"))
+    )
+    if await link.count() == 0:
+        return None
+    link = link.first
+
+    # Arm every listener before clicking so no signal can be missed
+    waiters = {
+        asyncio.create_task(page.wait_for_event("download", timeout=LONG_TIMEOUT)): "download",
+        asyncio.create_task(
+            page.wait_for_event("response", predicate=_is_pdf_response, timeout=LONG_TIMEOUT)
+        ): "response",
+        asyncio.create_task(page.wait_for_event("popup", timeout=LONG_TIMEOUT)): "popup",
+    }
     try:
-        async with page.expect_popup() as pop_info:
-            await link.click()
-        popup = await pop_info.value
-        await popup.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-        bytes_list = await popup.evaluate(
-            """
-            async () => {
-                const res = await fetch(window.location.href, { credentials: 'include' });
-                if (!res.ok) throw new Error('fetch failed ' + res.status);
-                const ab  = await res.arrayBuffer();
-                return Array.from(new Uint8Array(ab));
-            }
-        """
-        )
-        if bytes_list:
-            with open(out_path, "wb") as f:
-                f.write(bytes(bytes_list))
-            logger.info(f"PDF saved via popup fetch: {out_path}")
-            return str(out_path)
-    except Exception:
-        pass
+        await link.click()
+        pending = set(waiters)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    continue
+                saved = await _persist_pdf_signal(waiters[task], task.result(), out_path)
+                if saved:
+                    return saved
+    except Exception as e:
+        logger.debug("[fetch] click on PDF link failed: %s", e)
+    finally:
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
 
     return None
 
@@ -475,6 +531,7 @@ async def clean_hands_workflow(
     browser: Browser,
     screenshots: bool = False,
     ts: Optional[int] = None,
+    out_pdf: Optional[str] = None,
 ) -> ActionResult:
     ts = ts or int(time.time())
     urls: List[str] = []
@@ -495,7 +552,7 @@ async def clean_hands_workflow(
 
     # 1) Open site
     logger.info("Navigating to mytax.dc.gov")
-    await page.goto("https://mytax.dc.gov/_/", wait_until="domcontentloaded", timeout=LONG_TIMEOUT)
+    await page.goto(MYTAX_URL, wait_until="domcontentloaded", timeout=LONG_TIMEOUT)
     urls.append(page.url)
 
     # 2) Handle duplicated tab/window warning if present
@@ -526,10 +583,18 @@ async def clean_hands_workflow(
         logger.error(msg)
         return ActionResult(error=msg)
 
-    # 5) Classify compliance
-    await page.wait_for_timeout(1500)
+    # 5) Classify compliance once the result panel (or a status line) has rendered
+    result_marker = page.locator(RESULT_SELECTOR).or_(page.get_by_text(_STATUS_RE))
     try:
-        body_text = await page.text_content("body", timeout=NAV_TIMEOUT)
+        await result_marker.first.wait_for(state="attached", timeout=NAV_TIMEOUT)
+    except Exception as e:
+        logger.debug("Result panel not found, settling on network idle: %s", e)
+        try:
+            await page.wait_for_load_state("networkidle", timeout=SHORT_TIMEOUT)
+        except Exception:
+            pass
+    try:
+        body_text = await read_result_text(page)
     except Exception:
         body_text = None
 
@@ -548,30 +613,30 @@ async def clean_hands_workflow(
         await request_current_certificate(page)
         urls.append(page.url)
     except Exception as e:
-        logger.info(f"Request flow not completed (non-fatal): {e}")
+        logger.info("Request flow not completed (non-fatal): %s", e)
 
     # 7) Attempt to fetch PDF via link strategies (may or may not be present here)
     logger.info("Attempting to fetch certificate PDF (if available)")
-    out_pdf = ARTIFACTS_DIR / f"clean-hands-{notice}-{ts}.pdf"
+    out_pdf = Path(out_pdf) if out_pdf else ARTIFACTS_DIR / f"clean-hands-{notice}-{ts}.pdf"
     try:
         got_pdf = await fetch_certificate_pdf(page, out_pdf)
         if got_pdf:
             pdf_path = got_pdf
             result.pdf_path = pdf_path
     except Exception as e:
-        logger.info(f"PDF retrieval failed (non-fatal): {e}")
+        logger.info("PDF retrieval failed (non-fatal): %s", e)
 
     # 8) If we're on a PDF page (Retrieve URL), download it directly via browser context
     if not pdf_path and _looks_like_pdf_url(page.url):
-        logger.info(f"Currently on PDF page: {page.url}, attempting direct download")
+        logger.info("Currently on PDF page: %s, attempting direct download", page.url)
         try:
             got_pdf = await download_via_context_request(page, page.url, out_pdf)
             if got_pdf:
                 pdf_path = got_pdf
                 result.pdf_path = pdf_path
-                logger.info(f"Successfully downloaded PDF from current page: {got_pdf}")
+                logger.info("Successfully downloaded PDF from current page: %s", got_pdf)
         except Exception as e:
-            logger.info(f"Direct download from current page failed: {e}")
+            logger.info("Direct download from current page failed: %s", e)
 
     result.screenshot_path = screenshot_path
     return ActionResult(extracted_content=result.to_json(), is_done=True)
@@ -586,59 +651,64 @@ async def run_agent(
     headless: bool,
     screenshots: bool,
 ):
-    llm = ChatOpenAI(model=model_name)
+    # Borrow a warm browser from the shared pool instead of launching one per run
+    pool = get_pool(headless, downloads_path=ARTIFACTS_DIR, profile_dir=PROFILE_DIR, warm_url=MYTAX_URL)
+    browser = await pool.acquire()
+    try:
+        await _run_agent_session(browser, notice, last4, model_name, screenshots)
+    finally:
+        await pool.release(browser)
 
-    context_config = BrowserContextConfig(
-        save_downloads_path=str(ARTIFACTS_DIR),
-    )
-    browser_config = BrowserConfig(headless=headless, new_context_config=context_config)
-    browser = Browser(config=browser_config)
+
+async def _run_agent_session(
+    browser: Browser,
+    notice: str,
+    last4: str,
+    model_name: str,
+    screenshots: bool,
+):
+    llm = ChatOpenAI(model=model_name)
 
     # Single timestamp for the whole run
     ts = int(time.time())
     sniff_out = ARTIFACTS_DIR / f"clean-hands-{notice}-{ts}.pdf"
     sniff_state = {"saved": False, "path": None}
 
-    # Attach route-based capture + response sniffer to initial page (and to popups)
-    known_pages: List[Page] = []
+    # Attach route-based capture to initial page (and to popups)
+    # Weak refs: O(1) membership, and closed popups drop out instead of being kept alive
+    known_pages: "weakref.WeakSet[Page]" = weakref.WeakSet()
 
     def track_page(page: Page):
-        if page in known_pages:
-            return
-        known_pages.append(page)
+        known_pages.add(page)
 
     try:
         initial_page = await browser.get_current_page()
         track_page(initial_page)
+        # Context-level so popups inherit it; page-level PDF routes still take precedence
+        await block_heavy_resources(initial_page.context)
         await attach_pdf_route_capture(initial_page, sniff_out, sniff_state)
 
-        # Also attach a lightweight response sniffer (secondary signal)
-        def handle_response(resp):
-            if sniff_state.get("saved"):
-                return
-            try:
-                ct = (resp.headers.get("content-type") or "").lower()
-            except Exception:
-                ct = ""
-            url = getattr(resp, "url", "")
-            if _is_pdf_like_headers(ct, url):
-                asyncio.create_task(_save_resp_pdf(resp, sniff_out, sniff_state))
-
         def handle_popup(popup: Page):
             track_page(popup)
             asyncio.create_task(attach_pdf_route_capture(popup, sniff_out, sniff_state))
-            popup.on("response", handle_response)
 
-        initial_page.on("response", handle_response)
         initial_page.on("popup", handle_popup)
-        logger.info(f"[init] Handlers attached to page id={id(initial_page)}")
+        logger.info("[init] Handlers attached to page id=%s", id(initial_page))
 
     except Exception as e:
-        logger.debug(f"[init] Failed to attach handlers to initial page: {e}")
+        logger.debug("[init] Failed to attach handlers to initial page: %s", e)
 
-    # Initial deterministic action with shared timestamp
+    # Initial deterministic action with shared timestamp and output path
     initial_actions = [
-        {"clean_hands_workflow": {"notice": notice, "last4": last4, "screenshots": screenshots, "ts": ts}},
+        {
+            "clean_hands_workflow": {
+                "notice": notice,
+                "last4": last4,
+                "screenshots": screenshots,
+                "ts": ts,
+                "out_pdf": str(sniff_out),
+            }
+        },
     ]
 
     agent = Agent(
@@ -660,35 +730,24 @@ async def run_agent(
     logger.info("[harvest] Checking for open PDF tabs...")
     await harvest_from_pages(known_pages, sniff_out, sniff_state)
 
-    # Deterministic reattempt via link strategies on current page
+    # Post-run reattempt on the current page: read it directly when it already IS the PDF,
+    # otherwise click through the link strategies
     if not sniff_state["saved"]:
-        logger.info("[post-run] Attempting deterministic PDF fetch...")
         try:
             current_page = await browser.get_current_page()
-            out_pdf = ARTIFACTS_DIR / f"clean-hands-{notice}-{ts}.pdf"
-            got_pdf = await fetch_certificate_pdf(current_page, out_pdf)
+            current_url = getattr(current_page, "url", "")
+            if _looks_like_pdf_url(current_url):
+                logger.info("[post-run] Current page is PDF: %s, downloading directly", current_url)
+                got_pdf = await download_via_context_request(current_page, current_url, sniff_out)
+            else:
+                logger.info("[post-run] Attempting deterministic PDF fetch...")
+                got_pdf = await fetch_certificate_pdf(current_page, sniff_out)
             if got_pdf:
-                logger.info(f"[post-run] PDF saved via deterministic fetch: {got_pdf}")
+                logger.info("[post-run] PDF saved from current page: %s", got_pdf)
                 sniff_state["saved"] = True
                 sniff_state["path"] = got_pdf
         except Exception as e:
-            logger.debug(f"[post-run] deterministic fetch failed: {e}")
-
-    # If current page IS the PDF, download it directly (context request)
-    if not sniff_state["saved"]:
-        try:
-            current_page = await browser.get_current_page()
-            current_url = getattr(current_page, "url", "")
-            if _looks_like_pdf_url(current_url):
-                logger.info(f"[post-run] Current page is PDF: {current_url}, downloading directly")
-                out_pdf = ARTIFACTS_DIR / f"clean-hands-{notice}-{ts}.pdf"
-                got_pdf = await download_via_context_request(current_page, current_url, out_pdf)
-                if got_pdf:
-                    logger.info(f"[post-run] PDF saved directly from current page: {got_pdf}")
-                    sniff_state["saved"] = True
-                    sniff_state["path"] = got_pdf
-        except Exception as e:
-            logger.debug(f"[post-run] direct download from current page failed: {e}")
+            logger.debug("[post-run] fetch from current page failed: %s", e)
 
     # Forced download using exact URL from history — navigate to trigger route capture, then fallbacks
     if not sniff_state["saved"]:
@@ -704,43 +763,42 @@ async def run_agent(
             current_url = getattr(current_page, "url", None)
             pdf_url = pick_pdf_url_from_history(visited, current_url)
 
-            logger.info(f"[force] Visited URLs: {visited}")
-            logger.info(f"[force] Chosen PDF URL: {pdf_url}")
+            logger.info("[force] Visited URLs: %s", visited)
+            logger.info("[force] Chosen PDF URL: %s", pdf_url)
 
             if pdf_url:
-                out_pdf = ARTIFACTS_DIR / f"clean-hands-{notice}-{ts}.pdf"
-
-                # Navigate to the PDF URL to trigger the route capture (strongest method)
-                try:
-                    logger.info(f"[force] Navigating to PDF URL to trigger route capture: {pdf_url}")
-                    await current_page.goto(pdf_url, wait_until="load", timeout=LONG_TIMEOUT)
-                    # Small wait to allow route handler to persist file
-                    await current_page.wait_for_timeout(1000)
-                except Exception as e:
-                    logger.debug(f"[force] Navigation to PDF URL failed: {e}")
+                # Navigate to the PDF URL to trigger the route capture (strongest method),
+                # unless the page is already sitting on it
+                if current_url != pdf_url:
+                    try:
+                        logger.info("[force] Navigating to PDF URL to trigger route capture: %s", pdf_url)
+                        # The route handler writes the file before fulfilling, so "load" implies it is persisted
+                        await current_page.goto(pdf_url, wait_until="load", timeout=LONG_TIMEOUT)
+                    except Exception as e:
+                        logger.debug("[force] Navigation to PDF URL failed: %s", e)
 
                 # If still not saved, try context request + anchor/blob fallbacks
                 if not sniff_state["saved"]:
                     logger.info("[force] Trying context request fallback...")
-                    got = await download_via_context_request(current_page, pdf_url, out_pdf)
+                    got = await download_via_context_request(current_page, pdf_url, sniff_out)
 
                     if not got:
                         logger.info("[force] Context request failed; trying anchor fallback")
-                        got = await force_download_via_anchor(current_page, pdf_url, out_pdf)
+                        got = await force_download_via_anchor(current_page, pdf_url, sniff_out)
                     if not got:
                         logger.info("[force] Anchor fallback failed; trying blob fallback")
-                        got = await force_download_via_blob(current_page, pdf_url, out_pdf)
+                        got = await force_download_via_blob(current_page, pdf_url, sniff_out)
 
                     if got:
                         sniff_state["saved"] = True
                         sniff_state["path"] = got
-                        logger.info(f"[force] Success -> {got}")
+                        logger.info("[force] Success -> %s", got)
                     else:
                         logger.warning("[force] All forced download methods failed.")
             else:
                 logger.warning("[force] No Retrieve URL found to force-download.")
         except Exception as e:
-            logger.debug(f"[force] unexpected error: {e}")
+            logger.debug("[force] unexpected error: %s", e)
 
     print("\n-- Agent run complete --")
     try:
@@ -775,13 +833,16 @@ async def main():
     load_dotenv()
     args = parse_args()
 
-    await run_agent(
-        notice=args.notice,
-        last4=args.last4,
-        model_name=args.model,
-        headless=args.headless,
-        screenshots=args.screenshots,
-    )
+    try:
+        await run_agent(
+            notice=args.notice,
+            last4=args.last4,
+            model_name=args.model,
+            headless=args.headless,
+            screenshots=args.screenshots,
+        )
+    finally:
+        await get_pool(args.headless).close()
 
 
 if __name__ == "__main__":
@@ -1,13 +1,15 @@
 import argparse
 import asyncio
+import base64
 import json
 import logging
 import os
 import re
 import time
+import uuid
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 
 from dotenv import load_dotenv
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext, TimeoutError as PlaywrightTimeoutError
@@ -26,6 +28,18 @@ logger = logging.getLogger("mytaxdc")
 NAV_TIMEOUT = 60_000
 LONG_TIMEOUT = 300_000
 SHORT_TIMEOUT = 10_000
+# Single authenticated GET of the PDF (ms); a certificate is small, so this fails fast
+PDF_GET_TIMEOUT = 30_000
+# Refuse bodies larger than this (a certificate is well under 1 MB; anything huge is not it)
+MAX_PDF_BYTES = 50 * 1024 * 1024
+
+# Text that only appears once the search result has rendered
+RESULT_TEXT_RE = re.compile(r"currently\s+compliant|not\s+(?:in\s+)?complian|request.*notice|request.*Certificate", re.I)
+# Buttons/links shown once a certificate or notice request has been submitted
+VIEW_PDF_SELECTOR = (
+    "button:has-text('View Certificate'), button:has-text('View Notice'), "
+    "a:has-text('View Certificate'), a:has-text('View Notice')"
+)
 
 
 @dataclass
@@ -42,12 +56,125 @@ class WorkflowResult:
         return json.dumps(asdict(self), ensure_ascii=False)
 
 
+# ---------------------------
+# Precompiled patterns
+# ---------------------------
+# URLs that serve the certificate: plain .pdf links and GenTax /Retrieve/...?file__= downloads
+_PDF_URL_RE = re.compile(r"\.pdf(?:$|\?)|/retrieve/.*file__=", re.I)
+
+# Static assets the workflow never needs (icons, webfonts, media) and third-party analytics
+_HEAVY_ASSET_RE = re.compile(r"\.(?:png|jpe?g|gif|webp|ico|svg|bmp|woff2?|ttf|otf|eot|mp4|webm|mp3|wav)(?:$|\?)", re.I)
+_TRACKER_RE = re.compile(
+    r"^https?://(?:[^/]+\.)?(?:google-analytics\.com|googletagmanager\.com|doubleclick\.net|"
+    r"googlesyndication\.com|hotjar\.com|newrelic\.com|nr-data\.net)/",
+    re.I,
+)
+_BLOCKED_RESOURCE_TYPES = frozenset(("image", "font", "media"))
+
+# Ordered status rules for detect_status_from_text: (regex, status, log message), first match wins.
+# Key insight: determine compliance from what the page offers to request first.
+_STATUS_RULES = [
+    (
+        re.compile(r"click\s*here\s*to\s*request\s*a\s*current\s*certificate\s*of\s*clean\s*hands", re.I),
+        "compliant",
+        "Status: COMPLIANT (offers to request current certificate)",
+    ),
+    (
+        re.compile(r"click\s*here\s*to\s*request.*notice\s*of\s*non[-\s]?compliance", re.I),
+        "compliant",
+        "Status: COMPLIANT (offers to request non-compliance notice - means currently compliant)",
+    ),
+    # Explicit compliance (common page phrasing)
+    (re.compile(r"\bthis\s+taxpayer\s+is\s+currently\s+compliant\b", re.I), "compliant", "Status: COMPLIANT (currently compliant)"),
+    (re.compile(r"\bin\s+compliance\b", re.I), "compliant", "Status: COMPLIANT (in compliance)"),
+    (re.compile(r"\bis\s+compliant\b", re.I), "compliant", "Status: COMPLIANT (is compliant)"),
+    # Offer to request a non-compliance notice (means currently compliant)
+    (re.compile(r"request.*notice.*non[-\s]?compliance", re.I), "compliant", "Status: COMPLIANT (non-compliance notice offered)"),
+    (re.compile(r"click here to request.*non[-\s]?compliance", re.I), "compliant", "Status: COMPLIANT (non-compliance notice offered)"),
+    # Explicit non-compliance
+    (re.compile(r"\bnot\s+in\s+compliance\b", re.I), "noncompliant", "Status: NONCOMPLIANT (not in compliance)"),
+    (re.compile(r"\bis\s+not\s+compliant\b", re.I), "noncompliant", "Status: NONCOMPLIANT (is not compliant)"),
+    (re.compile(r"\bnot\s+compliant\b", re.I), "noncompliant", "Status: NONCOMPLIANT (not compliant)"),
+]
+_COMPLIANT_RE = re.compile(r"\bcompliant\b", re.I)
+_NON_COMPLIANT_RE = re.compile(r"\bnon[-\s]?complian(?:t|ce)\b", re.I)
+
+_START_OVER_RE = re.compile(r"Click\s*Here\s*to\s*Start\s*Over", re.I)
+_VALIDATE_LINK_RE = re.compile(r"Validate.*Clean\s*Hands", re.I)
+_VALIDATE_TEXT_RE = re.compile(r"Validate a Certificate of Clean Hands", re.I)
+_NOTICE_LABEL_RE = re.compile(r"notice\s*number", re.I)
+_NOTICE_PLACEHOLDER_RE = re.compile(r"notice", re.I)
+_LAST4_LABEL_RE = re.compile(r"(last\s*4|last\s*four)", re.I)
+_LAST4_PLACEHOLDER_RE = re.compile(r"last\s*4", re.I)
+_SEARCH_BUTTON_RE = re.compile(r"^Search$", re.I)
+_REQUEST_CERT_LINK_RE = re.compile(r"request.*Certificate of Clean Hands", re.I)
+_REQUEST_CERT_TEXT_RE = re.compile(r"Click here to request a current Certificate of Clean Hands", re.I)
+_REQUEST_NOTICE_LINK_RE = re.compile(r"request.*Notice of Non-Compliance", re.I)
+_REQUEST_NOTICE_TEXT_RE = re.compile(r"Click here to request a Notice of Non-Compliance", re.I)
+_NEXT_RE = re.compile(r"next", re.I)
+_SUBMIT_RE = re.compile(r"submit", re.I)
+_VIEW_PDF_RE = re.compile(r"view\s*(certificate|notice)", re.I)
+
+
 # ---------------------------
 # PDF Detection & Utilities
 # ---------------------------
 def looks_like_pdf_url(url: str) -> bool:
-    u = (url or "").lower()
-    return u.endswith(".pdf") or ("/retrieve/" in u and "file__=" in u)
+    return bool(_PDF_URL_RE.search(url or ""))
+
+
+_PDF_REQUEST_HEADERS = {
+    "Accept": "application/pdf,application/octet-stream,*/*",
+    "Referer": "https://mytax.dc.gov/_/",
+}
+
+# Re-fetch the current document in-page and return it base64-encoded: one compact string
+# over the protocol instead of a JSON array with one integer per byte
+_FETCH_AS_BASE64_JS = """
+async () => {
+    const res = await fetch(window.location.href, { credentials: 'include' });
+    if (!res.ok) throw new Error('fetch failed ' + res.status);
+    const bytes = new Uint8Array(await res.arrayBuffer());
+    let bin = '';
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+        bin += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return btoa(bin);
+}
+"""
+
+
+def _tmp_path(out_path: Path) -> Path:
+    # Unique per writer: the route capture and a raced saver may write the same PDF at once
+    return out_path.with_name(f"{out_path.name}.{uuid.uuid4().hex}.tmp")
+
+
+def _write_atomic(out_path: Path, data: bytes) -> None:
+    tmp = _tmp_path(out_path)
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, out_path)
+    finally:
+        tmp.unlink(missing_ok=True)  # only left behind if the write failed
+
+
+async def write_pdf(out_path: Path, data: bytes) -> None:
+    """
+    Write PDF bytes in a worker thread so the event loop keeps serving other pages.
+    The bytes go to a temp file that is renamed over out_path, so readers (e.g. the
+    API's /download-pdf) never see a half-written PDF.
+    """
+    await asyncio.to_thread(_write_atomic, out_path, data)
+
+
+async def save_download(download, out_path: Path) -> None:
+    """Save a Playwright download to a temp file, then atomically rename it to out_path."""
+    tmp = _tmp_path(out_path)
+    try:
+        await download.save_as(str(tmp))
+        await asyncio.to_thread(os.replace, tmp, out_path)
+    finally:
+        tmp.unlink(missing_ok=True)
 
 
 def is_pdf_like_headers(ct: Optional[str], url: Optional[str]) -> bool:
@@ -77,7 +204,7 @@ async def force_download_via_anchor(page: Page, url: str, out_path: Path) -> Opt
                 url,
             )
         download = await dl_info.value
-        await download.save_as(str(out_path))
+        await save_download(download, out_path)
         logger.info(f"[force-anchor] Downloaded -> {out_path}")
         return str(out_path)
     except Exception as e:
@@ -107,7 +234,7 @@ async def force_download_via_blob(page: Page, url: str, out_path: Path) -> Optio
                 url,
             )
         download = await dl_info.value
-        await download.save_as(str(out_path))
+        await save_download(download, out_path)
         logger.info(f"[force-blob] Downloaded -> {out_path}")
         return str(out_path)
     except Exception as e:
@@ -115,27 +242,39 @@ async def force_download_via_blob(page: Page, url: str, out_path: Path) -> Optio
         return None
 
 
-async def download_via_context_request(context: BrowserContext, url: str, out_path: Path) -> Optional[str]:
-    logger.info(f"[context-request] GET {url}")
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+async def _fetch_pdf_bytes(context: BrowserContext, url: str) -> Optional[bytes]:
+    """GET `url` through the context's request session (shares the page cookies) and return the body."""
+    resp = await context.request.get(
+        url,
+        headers=_PDF_REQUEST_HEADERS,
+        timeout=PDF_GET_TIMEOUT,
+        fail_on_status_code=False,
+    )
     try:
-        resp = await context.request.get(
-            url,
-            headers={
-                "Accept": "application/pdf,application/octet-stream,*/*",
-                "Referer": "https://mytax.dc.gov/_/",
-            },
-            timeout=LONG_TIMEOUT / 1000,  # seconds
-        )
         if not resp.ok:
             logger.warning(f"[context-request] {url} failed: {resp.status}")
             return None
+        length = resp.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_PDF_BYTES:
+            logger.warning(f"[context-request] {url} too large: {length} bytes")
+            return None
         data = await resp.body()
         if not data:
             logger.warning("[context-request] response had no body")
             return None
-        with open(out_path, "wb") as f:
-            f.write(data)
+        return data
+    finally:
+        await resp.dispose()
+
+
+async def download_via_context_request(context: BrowserContext, url: str, out_path: Path) -> Optional[str]:
+    logger.info(f"[context-request] GET {url}")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        data = await _fetch_pdf_bytes(context, url)
+        if data is None:
+            return None
+        await write_pdf(out_path, data)
         logger.info(f"[context-request] Saved -> {out_path} ({len(data)} bytes)")
         return str(out_path)
     except Exception as e:
@@ -143,42 +282,73 @@ async def download_via_context_request(context: BrowserContext, url: str, out_pa
         return None
 
 
+async def _capture_via_route(route, out_path: Path, state: dict) -> None:
+    """Route-capture task: fetch the PDF once, keep a copy, then hand the same response to the browser."""
+    url = route.request.url
+    try:
+        response = await route.fetch()
+        body = await response.body()
+        if response.ok and body:
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            await write_pdf(out_path, body)
+            state["saved"] = True
+            state["path"] = str(out_path)
+            logger.info(f"[route] Saved PDF via route: {out_path} ({len(body)} bytes) from {url}")
+        # Driver reuses the fetched response; the body is not sent back through Python
+        await route.fulfill(response=response)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"[route] error for {url}: {e}")
+        await route.continue_()
+    finally:
+        state.pop("_capture_task", None)
+
+
 async def attach_pdf_route_capture(context: BrowserContext, out_path: Path, state: dict):
     """
-    Intercept the actual PDF network request and persist bytes via route.fetch().
-    Context-level route captures all pages/popups.
+    Watch for the actual PDF network request and save a copy of it to out_path.
+    Only PDF-looking URLs are routed (see _PDF_URL_RE), so all other traffic
+    stays inside the browser and never reaches the handler. The request is made
+    once via route.fetch() and the same response is fulfilled back to the browser,
+    since a /retrieve link may not survive a second request. The in-flight
+    capture is kept in state["_capture_task"] so callers can await or cancel it.
     """
     if state.get("_route_attached"):
         return
     state["_route_attached"] = True
 
     async def handler(route):
-        if state.get("saved"):
+        request = route.request
+        # Replaying a form POST would resubmit it; leave those to the other strategies
+        if state.get("saved") or state.get("_capture_task") or request.method != "GET":
             await route.continue_()
             return
-        req = route.request
-        url = req.url or ""
-        if looks_like_pdf_url(url):
-            try:
-                resp = await route.fetch()
-                body = await resp.body()
-                if body:
-                    out_path.parent.mkdir(parents=True, exist_ok=True)
-                    with open(out_path, "wb") as f:
-                        f.write(body)
-                    state["saved"] = True
-                    state["path"] = str(out_path)
-                    logger.info(f"[route] Saved PDF via route: {out_path} ({len(body)} bytes) from {url}")
-                # Always fulfill to keep browser behavior intact
-                await route.fulfill(status=resp.status, headers=dict(resp.headers), body=body)
-            except Exception as e:
-                logger.warning(f"[route] error for {url}: {e}")
-                await route.continue_()
+        task = asyncio.create_task(_capture_via_route(route, out_path, state))
+        state["_capture_task"] = task
+        await asyncio.gather(task, return_exceptions=True)
+
+    await context.route(_PDF_URL_RE, handler)
+    logger.info("[route] PDF route capture attached at context level")
+
+
+async def block_heavy_resources(context: BrowserContext) -> None:
+    """
+    Abort image/font/media loads and analytics beacons for every page in the context.
+    Only asset-like and tracker URLs are routed, so documents, XHR and the PDF never
+    reach Python. Stylesheets are kept: visibility checks on the form depend on layout.
+    """
+    async def block_asset(route):
+        if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+            await route.abort()
         else:
             await route.continue_()
 
-    await context.route("**/*", handler)
-    logger.info("[route] PDF route capture attached at context level")
+    async def block_tracker(route):
+        await route.abort()
+
+    await context.route(_HEAVY_ASSET_RE, block_asset)
+    await context.route(_TRACKER_RE, block_tracker)
 
 
 def pick_pdf_url_from_history(urls: List[str], current_url: Optional[str]) -> Optional[str]:
@@ -190,33 +360,31 @@ def pick_pdf_url_from_history(urls: List[str], current_url: Optional[str]) -> Op
     return None
 
 
-async def harvest_from_pages(pages: List[Page], out_path: Path, state: dict):
-    """If any page currently shows a PDF, fetch bytes from its URL inside the page context."""
+async def harvest_from_pages(context: BrowserContext, pages: List[Page], out_path: Path, state: dict):
+    """
+    If any page currently shows a PDF, GET its URL through the context's request
+    session (same cookies as the tab). Falls back to a base64 fetch inside the page.
+    """
     if state.get("saved"):
         return state["path"]
     for p in pages:
         try:
             url = p.url
-            if looks_like_pdf_url(url):
-                logger.info(f"[harvest] Found open PDF tab: {url}")
-                bytes_list = await p.evaluate(
-                    """
-                    async () => {
-                        const res = await fetch(window.location.href, { credentials: 'include' });
-                        if (!res.ok) throw new Error('fetch failed ' + res.status);
-                        const ab  = await res.arrayBuffer();
-                        return Array.from(new Uint8Array(ab));
-                    }
-                """
-                )
-                if bytes_list:
-                    out_path.parent.mkdir(parents=True, exist_ok=True)
-                    with open(out_path, "wb") as f:
-                        f.write(bytes(bytes_list))
-                    state["saved"] = True
-                    state["path"] = str(out_path)
-                    logger.info(f"[harvest] Saved PDF -> {out_path}")
-                    return state["path"]
+            if not looks_like_pdf_url(url):
+                continue
+            logger.info(f"[harvest] Found open PDF tab: {url}")
+            got = await download_via_context_request(context, url, out_path)
+            if not got:
+                encoded = await p.evaluate(_FETCH_AS_BASE64_JS)
+                if not encoded:
+                    continue
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                await write_pdf(out_path, base64.b64decode(encoded))
+                got = str(out_path)
+            state["saved"] = True
+            state["path"] = got
+            logger.info(f"[harvest] Saved PDF -> {out_path}")
+            return state["path"]
         except Exception as e:
             logger.debug(f"[harvest] {e}")
     return None
@@ -236,6 +404,59 @@ async def maybe_click(page: Page, locator) -> bool:
     return False
 
 
+async def click_first_tier(page: Page, tiers: list) -> bool:
+    """
+    Click the first match of the highest-priority tier that is present. Each tier is one
+    `.or_()`-combined locator, so a lookup costs one query per tier rather than per selector;
+    tiers keep broad fallbacks from outranking specific matches in document order.
+    """
+    for loc in tiers:
+        if await maybe_click(page, loc):
+            return True
+    return False
+
+
+async def preferred_or_fallback(preferred, fallback):
+    """`preferred.first` if it matches anything right now, otherwise the positional fallback."""
+    try:
+        if await preferred.count() > 0:
+            return preferred.first
+    except Exception as e:
+        logger.debug(f"preferred_or_fallback: {e}")
+    return fallback
+
+
+async def wait_for_next(page: Page, locator, timeout: int = SHORT_TIMEOUT) -> None:
+    """
+    Settle until `locator` is visible. The page is usually already network-idle before
+    an in-page postback step renders, so idle is no signal here; only the element is.
+    The element may legitimately never appear (optional step), so timeouts are swallowed.
+    """
+    try:
+        await locator.first.wait_for(state="visible", timeout=timeout)
+    except Exception as e:
+        logger.debug(f"wait_for_next: {e}")
+
+
+async def log_clickables(page: Page) -> None:
+    """At DEBUG level, dump the page's links and buttons in a single evaluate() round-trip."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    try:
+        elements = await page.evaluate(
+            """() => [...document.querySelectorAll('a,button,input[type=submit],input[type=button]')].map(e => ({
+                tag: e.tagName,
+                text: (e.innerText || '').trim().slice(0, 80),
+                href: e.href || null,
+                value: e.value || null,
+                type: e.type || null,
+            }))"""
+        )
+        logger.debug(f"Found {len(elements)} links/buttons on page: {json.dumps(elements)}")
+    except Exception as e:
+        logger.debug(f"Could not enumerate links/buttons: {e}")
+
+
 async def save_screenshot(page: Page, dest: Path, enable: bool) -> Optional[str]:
     if not enable:
         return None
@@ -250,261 +471,247 @@ async def save_screenshot(page: Page, dest: Path, enable: bool) -> Optional[str]
 
 async def handle_security_warning(page: Page) -> None:
     try:
-        elements = [
-            page.get_by_role("link", name=re.compile(r"Click\s*Here\s*to\s*Start\s*Over", re.I)),
-            page.get_by_text(re.compile(r"Click\s*Here\s*to\s*Start\s*Over", re.I), exact=False),
-        ]
-        for el in elements:
-            if await maybe_click(page, el):
-                await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-                break
+        start_over = page.get_by_role("link", name=_START_OVER_RE).or_(page.get_by_text(_START_OVER_RE, exact=False))
+        if await maybe_click(page, start_over):
+            await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
     except Exception as e:
         logger.debug(f"No security warning handled (ok): {e}")
 
 
 def detect_status_from_text(text: str) -> Literal["compliant", "noncompliant", "unknown"]:
-    # Key insight: If page offers to "request a Notice of Non-Compliance", 
+    # Key insight: If page offers to "request a Notice of Non-Compliance",
     # it means the entity is currently COMPLIANT (otherwise they'd already have the notice)
-    
-    # Check for explicit compliance first (handle common page phrasing)
-    if re.search(r"\bthis\s+taxpayer\s+is\s+currently\s+compliant\b", text, re.I):
-        return "compliant"
-    if re.search(r"\bin\s+compliance\b", text, re.I):
-        return "compliant"
-    if re.search(r"\bis\s+compliant\b", text, re.I):
-        return "compliant"
-    
-    # Check if page offers to request non-compliance notice (means currently compliant)
-    if re.search(r"request.*notice.*non[-\s]?compliance", text, re.I):
-        return "compliant"
-    if re.search(r"click here to request.*non[-\s]?compliance", text, re.I):
-        return "compliant"
-    
-    # Check for explicit non-compliance status
-    if re.search(r"\bnot\s+in\s+compliance\b", text, re.I):
-        return "noncompliant"
-    if re.search(r"\bis\s+not\s+compliant\b", text, re.I):
-        return "noncompliant"
-    if re.search(r"\bnot\s+compliant\b", text, re.I):
-        return "noncompliant"
-    
+    for rx, label, msg in _STATUS_RULES:
+        if rx.search(text):
+            logger.info(msg)
+            return label
+
     # Generic compliant check (but avoid false positives from "non-compliant" / "noncompliance")
-    if (
-        re.search(r"\bcompliant\b", text, re.I)
-        and not re.search(r"\bnon[-\s]?compliant\b", text, re.I)
-        and not re.search(r"\bnon[-\s]?compliance\b", text, re.I)
-    ):
+    if _COMPLIANT_RE.search(text) and not _NON_COMPLIANT_RE.search(text):
+        logger.info("Status: COMPLIANT (generic match)")
         return "compliant"
-    
+
+    logger.info("Status: UNKNOWN (no status text matched)")
     return "unknown"
 
 
 async def click_validate_link(page: Page) -> None:
-    candidates = [
-        page.get_by_role("link", name=re.compile(r"Validate.*Clean\s*Hands", re.I)),
-        page.get_by_text(re.compile(r"Validate a Certificate of Clean Hands", re.I), exact=False),
-        page.locator("a:has-text('Validate a Certificate of Clean Hands')"),
-    ]
-    for loc in candidates:
-        if await maybe_click(page, loc):
-            await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-            return
-    raise RuntimeError("Could not find the 'Validate a Certificate of Clean Hands' link.")
+    link = (
+        page.get_by_role("link", name=_VALIDATE_LINK_RE)
+        .or_(page.get_by_text(_VALIDATE_TEXT_RE, exact=False))
+        .or_(page.locator("a:has-text('Validate a Certificate of Clean Hands')"))
+    )
+    try:
+        await link.first.click(timeout=SHORT_TIMEOUT)
+    except Exception as e:
+        raise RuntimeError("Could not find the 'Validate a Certificate of Clean Hands' link.") from e
+    await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
 
 
 async def fill_form_and_search(page: Page, notice: str, last4: str) -> None:
-    field_candidates = [
-        page.get_by_label(re.compile(r"notice\s*number", re.I)),
-        page.get_by_placeholder(re.compile(r"notice", re.I)),
-        page.locator("input").nth(0),
-    ]
-    last4_candidates = [
-        page.get_by_label(re.compile(r"(last\s*4|last\s*four)", re.I)),
-        page.get_by_placeholder(re.compile(r"last\s*4", re.I)),
+    # Label/placeholder matches are merged into one locator; the positional input is the
+    # fallback only when neither is on the page (document order could pick a hidden input)
+    notice_preferred = page.get_by_label(_NOTICE_LABEL_RE).or_(page.get_by_placeholder(_NOTICE_PLACEHOLDER_RE))
+    # Wait once for the form to render, so the short fill timeouts below only cover the fill.
+    # Only visible inputs count: hidden ASP.NET fields (__VIEWSTATE) come first in the DOM.
+    try:
+        await notice_preferred.or_(page.locator("input:visible")).first.wait_for(state="visible", timeout=NAV_TIMEOUT)
+    except Exception as e:
+        logger.debug(f"Form wait timed out, using positional fallback: {e}")
+    notice_field = await preferred_or_fallback(notice_preferred, page.locator("input").nth(0))
+    last4_field = await preferred_or_fallback(
+        page.get_by_label(_LAST4_LABEL_RE).or_(page.get_by_placeholder(_LAST4_PLACEHOLDER_RE)),
         page.locator("input").nth(1),
-    ]
-
-    for loc in field_candidates:
-        try:
-            await loc.fill(notice, timeout=LONG_TIMEOUT)
-            break
-        except Exception:
-            continue
-    else:
-        raise RuntimeError("Could not fill the Notice Number field.")
-
-    for loc in last4_candidates:
-        try:
-            await loc.click(timeout=LONG_TIMEOUT)
-            await loc.fill(last4, timeout=LONG_TIMEOUT)
-            break
-        except Exception:
-            continue
-    else:
-        raise RuntimeError("Could not fill the Last 4 field.")
+    )
 
-    if not await maybe_click(page, page.get_by_role("button", name=re.compile(r"^Search$", re.I))):
-        if not await maybe_click(page, page.locator('button:has-text("Search"), input[type="submit"][value*="Search" i]')):
-            await last4_candidates[-1].press("Enter")
+    try:
+        await notice_field.fill(notice, timeout=SHORT_TIMEOUT)
+    except Exception as e:
+        raise RuntimeError("Could not fill the Notice Number field.") from e
 
+    try:
+        await last4_field.click(timeout=SHORT_TIMEOUT)
+        await last4_field.fill(last4, timeout=SHORT_TIMEOUT)
+    except Exception as e:
+        raise RuntimeError("Could not fill the Last 4 field.") from e
 
-async def human_like_delay() -> None:
-    """Add random delays to mimic human behavior"""
-    import random
-    delay = random.uniform(0.5, 2.0)
-    await asyncio.sleep(delay)
+    search_button = page.get_by_role("button", name=_SEARCH_BUTTON_RE).or_(
+        page.locator('button:has-text("Search"), input[type="submit"][value*="Search" i]')
+    )
+    if not await maybe_click(page, search_button):
+        await last4_field.press("Enter")
 
 
 async def request_current_certificate(page: Page) -> None:
     """Handle both compliant (certificate) and non-compliant (notice) cases"""
     
-    # Look for both certificate and notice request links with comprehensive patterns
-    req_link_candidates = [
-        # Specific certificate patterns
-        page.get_by_role("link", name=re.compile(r"request.*Certificate of Clean Hands", re.I)),
-        page.get_by_text(re.compile(r"Click here to request a current Certificate of Clean Hands", re.I), exact=False),
-        # Specific notice patterns
-        page.get_by_role("link", name=re.compile(r"request.*Notice of Non-Compliance", re.I)),
-        page.get_by_text(re.compile(r"Click here to request a Notice of Non-Compliance", re.I), exact=False),
+    # Look for both certificate and notice request links, most specific tier first
+    req_link_tiers = [
+        # Specific certificate / notice patterns
+        page.get_by_role("link", name=_REQUEST_CERT_LINK_RE)
+        .or_(page.get_by_text(_REQUEST_CERT_TEXT_RE, exact=False))
+        .or_(page.get_by_role("link", name=_REQUEST_NOTICE_LINK_RE))
+        .or_(page.get_by_text(_REQUEST_NOTICE_TEXT_RE, exact=False))
+        .or_(page.locator("a:has-text('request a Notice'), a:has-text('request a current'), a:has-text('Click here to request')")),
         # More variations
-        page.locator("a:has-text('request a Notice')"),
-        page.locator("a:has-text('request a current')"),
-        page.locator("a:has-text('Click here to request')"),
-        page.locator("a:has-text('request')"),
-        page.locator("a[href*='request']"),
-        page.locator("a[href*='Request']"),
-        # CSS selectors for any clickable elements with "request" text
+        page.locator("a:has-text('request'), a[href*='request'], a[href*='Request']"),
+        # Any visible element with "request" text (also matches ancestors, so last)
         page.locator("*:has-text('Click here to request') >> visible=true"),
     ]
     
-    # First, let's see what links are actually available
-    try:
-        all_links = await page.locator("a").all()
-        logger.info(f"Found {len(all_links)} total links on page")
-        for i, link in enumerate(all_links[:10]):  # Log first 10 links
-            try:
-                text = await link.text_content()
-                href = await link.get_attribute("href")
-                if text and ("request" in text.lower() or "click" in text.lower()):
-                    logger.info(f"Link {i}: '{text}' -> {href}")
-            except Exception:
-                pass
-    except Exception as e:
-        logger.debug(f"Could not enumerate links: {e}")
-    
-    clicked_request = False
-    for loc in req_link_candidates:
-        if await maybe_click(page, loc):
-            logger.info(f"Clicked request link")
-            await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-            clicked_request = True
-            break
-    
-    if not clicked_request:
+    # Debug: let's see what links/buttons are actually available
+    await log_clickables(page)
+
+    clicked_request = await click_first_tier(page, req_link_tiers)
+    if clicked_request:
+        logger.info("Clicked request link")
+        await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
+    else:
         logger.info("No request link found; continuing.")
         return
 
-    # Add human-like delay before next action
-    await human_like_delay()
-    
-    # Click Next button (verify information step)
-    next_clicked = False
-    next_candidates = [
-        page.get_by_role("button", name=re.compile(r"next", re.I)),
-        page.locator("button:has-text('Next')"),
-        page.locator("input[type='submit'][value*='Next' i]"),
-        page.locator("button[value*='Next' i]"),
-        page.locator("*:has-text('Next') >> visible=true"),
-        # Look for any button-like element
-        page.locator("button").filter(has_text=re.compile(r"next", re.I)),
-    ]
-    
+    # Next button (verify information step)
+    next_button = (
+        page.get_by_role("button", name=_NEXT_RE)
+        .or_(page.locator("button").filter(has_text=_NEXT_RE))
+        .or_(page.locator("input[type='submit'][value*='Next' i], button[value*='Next' i]"))
+    )
+
+    # Wait for the verify-information step to render
+    await wait_for_next(page, next_button)
+
     # Debug: let's see what buttons are available
-    try:
-        all_buttons = await page.locator("button, input[type='submit'], input[type='button']").all()
-        logger.info(f"Found {len(all_buttons)} buttons/inputs on page")
-        for i, btn in enumerate(all_buttons):
-            try:
-                text = await btn.text_content()
-                value = await btn.get_attribute("value") 
-                btn_type = await btn.get_attribute("type")
-                logger.info(f"Button {i}: text='{text}' value='{value}' type='{btn_type}'")
-            except Exception:
-                pass
-    except Exception as e:
-        logger.debug(f"Could not enumerate buttons: {e}")
-    
-    for loc in next_candidates:
-        if await maybe_click(page, loc):
-            logger.info("Clicked Next button")
-            await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-            next_clicked = True
-            break
-    
-    if not next_clicked:
+    await log_clickables(page)
+
+    next_clicked = await click_first_tier(page, [next_button, page.locator("*:has-text('Next') >> visible=true")])
+    if next_clicked:
+        logger.info("Clicked Next button")
+        await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
+    else:
         logger.warning("Next button not found - skipping to submit")
         # Don't return, continue to try submit
     
-    # Add human-like delay before submit
-    await human_like_delay()
-    
-    # Click Submit button (confirm submission step)
-    submit_clicked = False
-    submit_candidates = [
-        page.get_by_role("button", name=re.compile(r"submit", re.I)),
-        page.locator("button:has-text('Submit')"),
-        page.locator("input[type='submit'][value*='Submit' i]"),
-        page.locator("button[value*='Submit' i]"),
-        page.locator("*:has-text('Submit') >> visible=true"),
-        page.locator("button").filter(has_text=re.compile(r"submit", re.I)),
-        # Try any submit-type input as fallback
-        page.locator("input[type='submit']"),
-    ]
-    
-    for loc in submit_candidates:
-        if await maybe_click(page, loc):
-            logger.info("Clicked Submit button")
-            await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-            submit_clicked = True
-            break
-    
-    if not submit_clicked:
+    # Submit button (confirm submission step)
+    submit_button = (
+        page.get_by_role("button", name=_SUBMIT_RE)
+        .or_(page.locator("button").filter(has_text=_SUBMIT_RE))
+        .or_(page.locator("input[type='submit'][value*='Submit' i], button[value*='Submit' i]"))
+    )
+
+    # Wait for the confirm-submission step to render
+    await wait_for_next(page, submit_button.or_(page.locator("input[type='submit']")))
+
+    submit_clicked = await click_first_tier(
+        page,
+        [
+            submit_button,
+            page.locator("*:has-text('Submit') >> visible=true"),
+            # Try any submit-type input as fallback
+            page.locator("input[type='submit']"),
+        ],
+    )
+    if submit_clicked:
+        logger.info("Clicked Submit button")
+        await page.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
+    else:
         logger.warning("Submit button not found")
         return
     
-    # Wait for confirmation page to load
-    await page.wait_for_timeout(2000)
+    # Wait for the confirmation page to offer the certificate/notice
+    try:
+        await page.locator(VIEW_PDF_SELECTOR).first.wait_for(state="visible", timeout=NAV_TIMEOUT)
+    except Exception as e:
+        logger.debug(f"View Certificate/Notice button did not appear: {e}")
     logger.info("Request submission completed")
 
 
-async def fetch_certificate_pdf(page: Page, out_path: Path, context: BrowserContext) -> Optional[str]:
+async def _save_download(download, out_path: Path, context: BrowserContext) -> Optional[str]:
+    await save_download(download, out_path)
+    logger.info(f"✅ PDF downloaded via native download: {out_path}")
+    return str(out_path)
+
+
+async def _save_same_tab_response(resp, out_path: Path, context: BrowserContext) -> Optional[str]:
+    data = await resp.body()
+    await write_pdf(out_path, data)
+    logger.info(f"✅ PDF saved via same-tab response: {out_path} ({len(data)} bytes)")
+    return str(out_path)
+
+
+async def _save_from_popup(popup: Page, out_path: Path, context: BrowserContext) -> Optional[str]:
+    logger.info(f"New tab opened: {popup.url}")
+    try:
+        # The URL is all we need: no load-state wait for the PDF viewer. If the popup
+        # opened on an intermediate page, unblock as soon as it navigates to the PDF.
+        if not looks_like_pdf_url(popup.url):
+            try:
+                await popup.wait_for_url(looks_like_pdf_url, timeout=SHORT_TIMEOUT)
+            except Exception as e:
+                logger.debug(f"Popup did not navigate to a PDF URL: {e}")
+
+        # Check if we can download directly via context request
+        if looks_like_pdf_url(popup.url):
+            logger.info(f"PDF URL detected in popup: {popup.url}")
+            result = await download_via_context_request(context, popup.url, out_path)
+            if result:
+                return result
+
+        # Fallback: fetch via JavaScript in the popup
+        try:
+            encoded = await popup.evaluate(_FETCH_AS_BASE64_JS)
+        except Exception as e:
+            logger.debug(f"Popup fetch failed: {e}")
+            encoded = None
+
+        if encoded:
+            data = base64.b64decode(encoded)
+            await write_pdf(out_path, data)
+            logger.info(f"✅ PDF saved via popup fetch: {out_path} ({len(data)} bytes)")
+            return str(out_path)
+        logger.warning("Popup fetch returned no data")
+        return None
+    finally:
+        await popup.close()
+
+
+# Save path for each signal raced in fetch_certificate_pdf
+_PDF_SIGNAL_SAVERS = {
+    "download": _save_download,
+    "response": _save_same_tab_response,
+    "popup": _save_from_popup,
+}
+
+
+async def fetch_certificate_pdf(
+    page: Page, out_path: Path, context: BrowserContext, route_state: Optional[dict] = None
+) -> Optional[str]:
     """
-    Enhanced PDF fetch with multiple strategies and new tab handling:
-      1) expect_download (attachment)
-      2) expect_response bytes (inline)
-      3) popup -> fetch(window.location.href) (inline in new tab)
-      4) context request (authenticated download)
+    Enhanced PDF fetch: one click on the View button, with three signals raced.
+    Whichever fires first is saved; if it yields nothing, the others keep waiting:
+      - download (attachment)
+      - same-tab PDF response (inline)
+      - popup -> context request / fetch(window.location.href) (inline in new tab)
+    Returns early whenever the context-level route capture has already saved the PDF.
     """
-    await human_like_delay()
-    
-    # Look for View buttons more comprehensively
-    candidates = [
-        page.get_by_role("button", name=re.compile(r"view\s*(certificate|notice)", re.I)),
-        page.get_by_role("link", name=re.compile(r"view\s*(certificate|notice)", re.I)),
-        page.get_by_text(re.compile(r"view\s*(certificate|notice)", re.I), exact=False),
-        page.locator("button:has-text('View Certificate')"),
-        page.locator("button:has-text('View Notice')"),
-        page.locator("a:has-text('View Certificate')"),
-        page.locator("a:has-text('View Notice')"),
+    route_state = route_state if route_state is not None else {}
+    if route_state.get("saved"):
+        return route_state["path"]
+
+    # Look for View buttons: named controls first, then any onclick "view" handler
+    view_tiers = [
+        page.get_by_role("button", name=_VIEW_PDF_RE)
+        .or_(page.get_by_role("link", name=_VIEW_PDF_RE))
+        .or_(page.get_by_text(_VIEW_PDF_RE, exact=False))
+        .or_(page.locator(VIEW_PDF_SELECTOR)),
         page.locator("[onclick*='view'], [onclick*='View']"),
     ]
 
     link = None
-    for loc in candidates:
+    for loc in view_tiers:
         try:
             if await loc.count() > 0:
                 link = loc.first
-                logger.info(f"Found view link/button: {await loc.first.text_content()}")
+                logger.info(f"Found view link/button: {await link.text_content()}")
                 break
         except Exception:
             continue
@@ -515,84 +722,148 @@ async def fetch_certificate_pdf(page: Page, out_path: Path, context: BrowserCont
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Strategy 1: native download (rare for government sites)
+    # Arm every listener before the single click. All three watch concurrently,
+    # so NAV_TIMEOUT bounds the whole fetch instead of LONG_TIMEOUT per strategy.
+    waiters = {
+        asyncio.create_task(page.wait_for_event("download", timeout=NAV_TIMEOUT)): "download",
+        asyncio.create_task(
+            page.wait_for_event(
+                "response",
+                predicate=lambda r: is_pdf_like_headers(r.headers.get("content-type"), r.url),
+                timeout=NAV_TIMEOUT,
+            )
+        ): "response",
+        asyncio.create_task(page.wait_for_event("popup", timeout=NAV_TIMEOUT)): "popup",
+    }
     try:
-        logger.info("Trying Strategy 1: Native download")
-        async with page.expect_download(timeout=LONG_TIMEOUT) as dl_info:
-            await link.click()
-        download = await dl_info.value
-        await download.save_as(str(out_path))
-        logger.info(f"✅ PDF downloaded via native download: {out_path}")
-        return str(out_path)
+        await link.click()
+        pending = set(waiters)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                # The route capture may have finished while we waited on the browser
+                if route_state.get("saved"):
+                    logger.info("PDF already captured by route; skipping remaining strategies")
+                    return route_state["path"]
+                kind = waiters[task]
+                if task.exception() is not None:
+                    logger.debug(f"{kind} signal not received: {task.exception()}")
+                    continue
+                try:
+                    saved = await _PDF_SIGNAL_SAVERS[kind](task.result(), out_path, context)
+                except Exception as e:
+                    logger.debug(f"Saving PDF from {kind} failed: {e}")
+                    continue
+                if saved:
+                    return saved
     except Exception as e:
-        logger.debug(f"Strategy 1 failed: {e}")
+        logger.debug(f"Clicking View button failed: {e}")
+    finally:
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    if route_state.get("saved"):
+        return route_state["path"]
+    logger.warning("All PDF fetch strategies failed")
+    return None
 
-    # Strategy 2: same-tab response bytes
-    try:
-        logger.info("Trying Strategy 2: Same-tab response")
-        async with page.expect_response(lambda r: is_pdf_like_headers(r.headers.get("content-type"), r.url), timeout=LONG_TIMEOUT) as resp_info:
-            await link.click()
-        resp = await resp_info.value
-        data = await resp.body()
-        with open(out_path, "wb") as f:
-            f.write(data)
-        logger.info(f"✅ PDF saved via same-tab response: {out_path} ({len(data)} bytes)")
-        return str(out_path)
-    except Exception as e:
-        logger.debug(f"Strategy 2 failed: {e}")
 
-    # Strategy 3: popup/new tab -> fetch (most common for DC MyTax)
-    try:
-        logger.info("Trying Strategy 3: Popup/new tab")
-        async with page.expect_popup(timeout=LONG_TIMEOUT) as pop_info:
-            await link.click()
-        popup = await pop_info.value
-        logger.info(f"New tab opened: {popup.url}")
-        
-        # Wait for PDF to load in new tab
-        await popup.wait_for_load_state("domcontentloaded", timeout=NAV_TIMEOUT)
-        await popup.wait_for_timeout(2000)  # Extra time for PDF viewer
-        
-        # Check if we can download directly via context request
-        if looks_like_pdf_url(popup.url):
-            logger.info(f"PDF URL detected in popup: {popup.url}")
-            result = await download_via_context_request(context, popup.url, out_path)
-            if result:
-                await popup.close()
-                return result
-        
-        # Fallback: fetch via JavaScript in the popup
-        bytes_list = await popup.evaluate(
-            """
-            async () => {
-                try {
-                    const res = await fetch(window.location.href, { credentials: 'include' });
-                    if (!res.ok) throw new Error('fetch failed ' + res.status);
-                    const ab  = await res.arrayBuffer();
-                    return Array.from(new Uint8Array(ab));
-                } catch (e) {
-                    console.error('Fetch error:', e);
-                    return null;
-                }
-            }
-        """
+# ---------------------------
+# Shared browser
+# ---------------------------
+# Rendering/background features the workflow never uses; passed on every platform
+PERF_BROWSER_ARGS = [
+    "--blink-settings=imagesEnabled=false",
+    "--disable-features=Translate,BackForwardCache,AcceptCHFrame,MediaRouter,OptimizationHints",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-ipc-flooding-protection",
+]
+
+
+async def launch_browser(pw, headless: bool) -> Browser:
+    # Detect environment and configure browser accordingly
+    browser_args = list(PERF_BROWSER_ARGS)
+    executable_path = None
+    
+    # Check for Heroku environment
+    if os.getenv("DYNO") or os.path.exists("/app"):
+        # Heroku environment - use Chrome for Testing buildpack
+        if os.path.exists("/app/.chrome-for-testing/chrome-linux64/chrome"):
+            executable_path = "/app/.chrome-for-testing/chrome-linux64/chrome"
+        # Heroku-specific args for sandboxing
+        browser_args += [
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-gpu",
+            "--disable-extensions",
+            "--disable-background-timer-throttling",
+            "--disable-backgrounding-occluded-windows",
+            "--disable-renderer-backgrounding"
+        ]
+    
+    # Launch browser with appropriate configuration
+    if executable_path:
+        logger.info(f"Using Chrome at: {executable_path}")
+        return await pw.chromium.launch(
+            headless=headless,
+            executable_path=executable_path,
+            args=browser_args
+        )
+    else:
+        logger.info("Using default Playwright Chromium")
+        return await pw.chromium.launch(
+            headless=headless,
+            args=browser_args
         )
-        
-        if bytes_list and len(bytes_list) > 0:
-            with open(out_path, "wb") as f:
-                f.write(bytes(bytes_list))
-            logger.info(f"✅ PDF saved via popup fetch: {out_path} ({len(bytes_list)} bytes)")
-            await popup.close()
-            return str(out_path)
-        else:
-            logger.warning("Popup fetch returned no data")
-            await popup.close()
-            
-    except Exception as e:
-        logger.debug(f"Strategy 3 failed: {e}")
 
-    logger.warning("All PDF fetch strategies failed")
-    return None
+
+class _BrowserPool:
+    """
+    Process-wide Playwright driver and Chromium (one per headless mode), launched on
+    first use so only the first run_workflow call pays the cold start.
+    """
+    _pw = None
+    _browsers: Dict[bool, Browser] = {}
+    _lock = asyncio.Lock()
+
+    @classmethod
+    async def get(cls, headless: bool) -> Browser:
+        async with cls._lock:
+            browser = cls._browsers.get(headless)
+            if browser is not None and browser.is_connected():
+                return browser
+            if cls._pw is None:
+                cls._pw = await async_playwright().start()
+            browser = cls._browsers[headless] = await launch_browser(cls._pw, headless)
+            return browser
+
+    @classmethod
+    async def close(cls) -> None:
+        async with cls._lock:
+            for browser in cls._browsers.values():
+                try:
+                    await browser.close()
+                except Exception as e:
+                    logger.debug(f"browser close failed: {e}")
+            cls._browsers.clear()
+            if cls._pw is not None:
+                await cls._pw.stop()
+                cls._pw = None
+
+
+async def get_shared_browser(headless: bool = True) -> Browser:
+    """The process-wide browser for `headless`, launched (or relaunched after a crash) on demand."""
+    return await _BrowserPool.get(headless)
+
+
+async def close_shared_browser() -> None:
+    """Close every shared browser and stop the Playwright driver."""
+    await _BrowserPool.close()
 
 
 # ---------------------------
@@ -600,6 +871,41 @@ async def fetch_certificate_pdf(page: Page, out_path: Path, context: BrowserCont
 # ---------------------------
 async def run_workflow(notice: str, last4: str, headless: bool, screenshots: bool, model_name: str) -> WorkflowResult:
     # model_name is unused here (deterministic script), kept to match your CLI
+    browser = await _BrowserPool.get(headless)
+    return await run_workflow_on_browser(browser, notice, last4, screenshots)
+
+
+async def new_workflow_context(browser: Browser) -> BrowserContext:
+    """A context configured for the workflow (downloads enabled)."""
+    return await browser.new_context(accept_downloads=True)
+
+
+async def run_workflow_on_browser(browser: Browser, notice: str, last4: str, screenshots: bool) -> WorkflowResult:
+    """Run the workflow on a caller-owned browser: opens and closes one context, never the browser."""
+    # Every run gets its own context on the shared browser (cookies, GenTax session, routes)
+    context = await new_workflow_context(browser)
+    try:
+        return await run_workflow_in_context(context, notice, last4, screenshots)
+    finally:
+        await context.close()
+
+
+async def _reset_context(context: BrowserContext) -> None:
+    """Drop the routes, pages and cookies a run left behind so the context can be reused."""
+    try:
+        await context.unroute_all(behavior="ignoreErrors")
+        for p in list(context.pages):
+            await p.close()
+        await context.clear_cookies()
+    except Exception as e:
+        logger.debug(f"context reset failed: {e}")
+
+
+async def run_workflow_in_context(context: BrowserContext, notice: str, last4: str, screenshots: bool) -> WorkflowResult:
+    """
+    Run the workflow on a caller-owned context (e.g. from a pool of warm contexts).
+    Everything the run adds to the context is removed again before returning.
+    """
     ts = int(time.time())
     urls: List[str] = []
     result = WorkflowResult(
@@ -612,53 +918,24 @@ async def run_workflow(notice: str, last4: str, headless: bool, screenshots: boo
         last4=last4,
     )
 
-    async with async_playwright() as pw:
-        # Detect environment and configure browser accordingly
-        browser_args = []
-        executable_path = None
-        
-        # Check for Heroku environment
-        if os.getenv("DYNO") or os.path.exists("/app"):
-            # Heroku environment - use Chrome for Testing buildpack
-            if os.path.exists("/app/.chrome-for-testing/chrome-linux64/chrome"):
-                executable_path = "/app/.chrome-for-testing/chrome-linux64/chrome"
-            # Heroku-specific args for sandboxing
-            browser_args = [
-                "--no-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-gpu",
-                "--disable-extensions",
-                "--disable-background-timer-throttling",
-                "--disable-backgrounding-occluded-windows",
-                "--disable-renderer-backgrounding"
-            ]
-        
-        # Launch browser with appropriate configuration
-        if executable_path:
-            logger.info(f"Using Chrome at: {executable_path}")
-            browser: Browser = await pw.chromium.launch(
-                headless=headless,
-                executable_path=executable_path,
-                args=browser_args
-            )
-        else:
-            logger.info("Using default Playwright Chromium")
-            browser: Browser = await pw.chromium.launch(
-                headless=headless,
-                args=browser_args if browser_args else None
-            )
-        context: BrowserContext = await browser.new_context(accept_downloads=True)
+    # Track all pages (for harvest)
+    known_pages: List[Page] = []
+
+    def track_page(p: Page) -> None:
+        if p not in known_pages:
+            known_pages.append(p)
+
+    route_state = {"saved": False, "path": None}
+    context.on("page", track_page)
+    try:
         page: Page = await context.new_page()
+        track_page(page)
 
         # Route-based PDF capture (strongest method)
         out_pdf = ARTIFACTS_DIR / f"clean-hands-{notice}-{ts}.pdf"
-        route_state = {"saved": False, "path": None}
+        await block_heavy_resources(context)
         await attach_pdf_route_capture(context, out_pdf, route_state)
 
-        # Track all pages (for harvest)
-        known_pages: List[Page] = [page]
-        context.on("page", lambda p: known_pages.append(p))
-
         # 1) Open site
         logger.info("Navigating to https://mytax.dc.gov/_/")
         await page.goto("https://mytax.dc.gov/_/", wait_until="domcontentloaded", timeout=LONG_TIMEOUT)
@@ -682,8 +959,15 @@ async def run_workflow(notice: str, last4: str, headless: bool, screenshots: boo
         logger.info("Filling form and searching")
         await fill_form_and_search(page, notice, last4)
 
-        # 5) Classify compliance - wait longer for results to fully load
-        await page.wait_for_timeout(3000)  # Wait longer for page to fully load
+        # 5) Classify compliance once the result text has rendered
+        try:
+            await page.get_by_text(RESULT_TEXT_RE).first.wait_for(state="attached", timeout=NAV_TIMEOUT)
+        except Exception as e:
+            logger.debug(f"Result text not found, settling on network idle: {e}")
+            try:
+                await page.wait_for_load_state("networkidle", timeout=SHORT_TIMEOUT)
+            except Exception:
+                pass
         try:
             body_text = await page.text_content("body", timeout=NAV_TIMEOUT)
         except Exception:
@@ -691,17 +975,8 @@ async def run_workflow(notice: str, last4: str, headless: bool, screenshots: boo
         
         logger.info(f"Page text snippet: {(body_text or '')[:200]}...")
         
-        # Key insight: Determine compliance status based on what certificate is offered
-        # Use regex to allow minor wording variations (e.g., suffixes like "for this taxpayer")
-        if re.search(r"click\s*here\s*to\s*request\s*a\s*current\s*certificate\s*of\s*clean\s*hands", (body_text or ""), re.I):
-            logger.info("Status: COMPLIANT (offers to request current certificate)")
-            status = "compliant"
-        elif re.search(r"click\s*here\s*to\s*request.*notice\s*of\s*non[-\s]?compliance", (body_text or ""), re.I):
-            logger.info("Status: COMPLIANT (offers to request non-compliance notice - means currently compliant)")
-            status = "compliant"
-        else:
-            status = detect_status_from_text(body_text or "")
-            logger.info(f"Status detected from text analysis: {status}")
+        # Single classification pass over the text already read above
+        status = detect_status_from_text(body_text or "")
         
         result.status = status
         result.message = "Detected compliance status from page." if status != "unknown" else "Could not detect compliance status."
@@ -713,7 +988,6 @@ async def run_workflow(notice: str, last4: str, headless: bool, screenshots: boo
         # 6) Request a current certificate (non-fatal if flow differs)
         logger.info("Attempting to request current certificate (non-fatal if unavailable)")
         try:
-            await page.wait_for_timeout(2000)  # Give more time for request links to appear
             await request_current_certificate(page)
             urls.append(page.url)
         except Exception as e:
@@ -722,13 +996,18 @@ async def run_workflow(notice: str, last4: str, headless: bool, screenshots: boo
         # 7) Attempt to fetch via link strategies (must be after request completion)
         logger.info("Attempting to fetch certificate PDF (if available)")
         try:
-            got = await fetch_certificate_pdf(page, out_pdf, context)
+            got = await fetch_certificate_pdf(page, out_pdf, context, route_state)
             if got:
                 route_state["saved"] = True
                 route_state["path"] = got
         except Exception as e:
             logger.info(f"PDF retrieval via links failed (non-fatal): {e}")
 
+        # Let an in-flight route capture finish before trying to fetch the same PDF again
+        capture = route_state.get("_capture_task")
+        if capture is not None:
+            await asyncio.gather(capture, return_exceptions=True)
+
         # 8) If current page IS the PDF, download it via context
         if not route_state["saved"] and looks_like_pdf_url(page.url):
             got = await download_via_context_request(context, page.url, out_pdf)
@@ -738,7 +1017,7 @@ async def run_workflow(notice: str, last4: str, headless: bool, screenshots: boo
 
         # 9) Harvest any open PDF tabs (viewer already open)
         if not route_state["saved"]:
-            await harvest_from_pages(known_pages, out_pdf, route_state)
+            await harvest_from_pages(context, known_pages, out_pdf, route_state)
 
         # 10) If still not saved but we visited a /Retrieve/ URL, go to it to trigger route capture
         if not route_state["saved"]:
@@ -747,10 +1026,15 @@ async def run_workflow(notice: str, last4: str, headless: bool, screenshots: boo
                 logger.info(f"[force] Navigating directly to PDF URL to trigger capture: {pdf_url}")
                 try:
                     await page.goto(pdf_url, wait_until="load", timeout=LONG_TIMEOUT)
-                    await page.wait_for_timeout(1000)  # allow route to persist
                 except Exception as e:
                     logger.debug(f"[force] navigation to pdf failed: {e}")
 
+                # The route handler saves in a background task, so "load" does not imply the
+                # file is persisted; wait for it rather than fetching the same PDF twice
+                capture = route_state.get("_capture_task")
+                if capture is not None:
+                    await asyncio.gather(capture, return_exceptions=True)
+
                 if not route_state["saved"]:
                     # Context request then anchor/blob fallbacks
                     got = await download_via_context_request(context, pdf_url, out_pdf)
@@ -770,9 +1054,13 @@ async def run_workflow(notice: str, last4: str, headless: bool, screenshots: boo
             logger.info(f"PDF successfully downloaded: {result.pdf_path} - Status corrected to COMPLIANT")
             result.status = "compliant" 
             result.message = "Status confirmed: COMPLIANT (certificate downloaded successfully)"
-
-        await context.close()
-        await browser.close()
+    finally:
+        context.remove_listener("page", track_page)
+        capture = route_state.get("_capture_task")
+        if capture and not capture.done():
+            capture.cancel()
+            await asyncio.gather(capture, return_exceptions=True)
+        await _reset_context(context)
 
     return result
 
@@ -794,13 +1082,16 @@ def parse_args() -> argparse.Namespace:
 async def main():
     load_dotenv()
     args = parse_args()
-    res = await run_workflow(
-        notice=args.notice,
-        last4=args.last4,
-        headless=args.headless,
-        screenshots=args.screenshots,
-        model_name=args.model,
-    )
+    try:
+        res = await run_workflow(
+            notice=args.notice,
+            last4=args.last4,
+            headless=args.headless,
+            screenshots=args.screenshots,
+            model_name=args.model,
+        )
+    finally:
+        await close_shared_browser()
     print("\n-- Run complete --")
     print("Visited URLs:", res.urls)
     print("Status:", res.status)
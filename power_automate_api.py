@@ -5,24 +5,39 @@ Uses the proven newdcagent.py workflow
 """
 import asyncio
 import os
+import sys
 import json
 import base64
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
-from pydantic import BaseModel, EmailStr, Field
+import bisect
+import functools
+import hashlib
+import time
+import uuid
+from prometheus_client import CollectorRegistry, Histogram, make_asgi_app
+import sqlite3
+from contextlib import asynccontextmanager, closing
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+logger = logging.getLogger("power_automate_api")
 
 # Import our working DC Clean Hands workflow
 try:
-    from newdcagent import run_workflow, WorkflowResult
+    from newdcagent import (
+        run_workflow_in_context, new_workflow_context, get_shared_browser, close_shared_browser, WorkflowResult
+    )
     WORKFLOW_AVAILABLE = True
-    print("✅ DC Clean Hands workflow available")
+    logger.info("✅ DC Clean Hands workflow available")
 except Exception as e:
     WORKFLOW_AVAILABLE = False
-    print(f"❌ DC Clean Hands workflow not available: {e}")
+    logger.error(f"❌ DC Clean Hands workflow not available: {e}")
 
 load_dotenv()
 
@@ -30,39 +45,273 @@ load_dotenv()
 ARTIFACTS_DIR = Path(__file__).parent / "artifacts"
 ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
-logger = logging.getLogger("power_automate_api")
+# Development mode: per-request access lines and auto-reload are only worth their cost here
+DEV = os.getenv("DEV", "0") == "1"
+if not DEV:
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+
+# Browser settings for API runs, fixed once at import (env-overridable)
+HEADLESS = os.getenv("HEADLESS", "1") == "1"
+SCREENSHOTS = os.getenv("SCREENSHOTS", "0") == "1"
+RUN_WORKFLOW = functools.partial(run_workflow_in_context, screenshots=SCREENSHOTS) if WORKFLOW_AVAILABLE else None
+
+# Cap on concurrent workflow runs (one browser context each)
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "4"))
+WORKFLOW_SEM = asyncio.Semaphore(MAX_CONCURRENCY)
+_running_workflows = 0
+
+# Warm browser contexts reused across runs, one slot per permit of WORKFLOW_SEM.
+# Slots hold (context or None, uses); a context is replaced after CONTEXT_MAX_USES runs,
+# after a failed run, or when the shared browser has been relaunched underneath it.
+CONTEXT_MAX_USES = int(os.getenv("CONTEXT_MAX_USES", "20"))
+CONTEXT_POOL: asyncio.Queue = asyncio.Queue()
+for _ in range(MAX_CONCURRENCY):
+    CONTEXT_POOL.put_nowait((None, 0))
+
+async def _close_context_quietly(context) -> None:
+    try:
+        await context.close()
+    except Exception as e:
+        logger.debug(f"context close failed: {e}")
+
+async def _acquire_context(browser):
+    """Take a context slot (waits if all are busy) and make sure it holds a live context on `browser`"""
+    context, uses = await CONTEXT_POOL.get()
+    if context is not None and (context.browser is not browser or uses >= CONTEXT_MAX_USES):
+        await _close_context_quietly(context)
+        context = None
+    if context is None:
+        try:
+            context, uses = await new_workflow_context(browser), 0
+        except Exception:
+            CONTEXT_POOL.put_nowait((None, 0))
+            raise
+    return context, uses
+
+async def _release_context(context, uses: int, reusable: bool = True) -> None:
+    """Hand a context slot back; an unusable context is closed and the slot left empty"""
+    if reusable:
+        CONTEXT_POOL.put_nowait((context, uses))
+    else:
+        await _close_context_quietly(context)
+        CONTEXT_POOL.put_nowait((None, 0))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Launch Chromium once at startup and keep it and a few contexts warm across requests."""
+    app.state.browser = None
+    if WORKFLOW_AVAILABLE:
+        try:
+            app.state.browser = await get_shared_browser(headless=HEADLESS)
+            logger.info("🌐 Shared browser launched")
+            # Pre-warm every context slot
+            for _ in range(MAX_CONCURRENCY):
+                await _release_context(*await _acquire_context(app.state.browser))
+        except Exception as e:
+            # Not fatal: the first request retries the launch
+            logger.error(f"❌ Shared browser launch failed: {e}")
+    try:
+        yield
+    finally:
+        if WORKFLOW_AVAILABLE:
+            await close_shared_browser()
+            logger.info("🌐 Shared browser closed")
 
 app = FastAPI(
     title="DC Clean Hands API for Power Automate", 
     version="1.0.0",
-    description="Power Automate-compatible API for DC Clean Hands certificate checking"
+    description="Power Automate-compatible API for DC Clean Hands certificate checking",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # large pdf_base64 payloads serialize much faster
 )
 
-print("🚀 Starting DC Clean Hands API for Power Automate...")
-print(f"🗂️ Artifacts directory: {ARTIFACTS_DIR}")
-print(f"🌐 Workflow available: {WORKFLOW_AVAILABLE}")
+def _elapsed_seconds(start_ns: int) -> float:
+    """Seconds since a time.perf_counter_ns() reading (monotonic, unlike time.time())"""
+    return (time.perf_counter_ns() - start_ns) / 1e9
+
+# Prometheus request timing, scraped from /metrics. The registry is module-owned:
+# `python power_automate_api.py` imports this module a second time (as the uvicorn
+# app string), and the default registry would reject the duplicate histogram.
+METRICS_REGISTRY = CollectorRegistry()
+REQUEST_SECONDS = Histogram(
+    "clean_hands_request_seconds",
+    "End-to-end HTTP request time",
+    ["method", "path", "status"],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+    registry=METRICS_REGISTRY
+)
+app.mount("/metrics", make_asgi_app(registry=METRICS_REGISTRY))
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start_ns = time.perf_counter_ns()
+    response = await call_next(request)
+    # Label by route template, not raw URL, so /jobs/{job_id} stays one series
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    REQUEST_SECONDS.labels(request.method, path, str(response.status_code)).observe(_elapsed_seconds(start_ns))
+    return response
+
+logger.info(f"🚀 Starting DC Clean Hands API for Power Automate (artifacts: {ARTIFACTS_DIR}, workflow available: {WORKFLOW_AVAILABLE})")
 
 class CleanHandsRequest(BaseModel):
+    # Unknown fields are ignored (not forbidden) so existing flows that send extras keep working
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     notice: str = Field(..., min_length=5, max_length=64, description="Notice number (e.g. L0012322733)")
     last4: str = Field(..., pattern=r"^\d{4}$", description="Last 4 digits of taxpayer ID")
     email: EmailStr = Field(..., description="Email address for notifications")
+    encode_pdf: bool = Field(False, description="Also return the PDF inline as base64 (default: download URL only)")
 
 class CleanHandsResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
     status: str = Field(..., description="Compliance status: compliant, noncompliant, or unknown")
     notice: str = Field(..., description="The notice number processed")
     last4: str = Field(..., description="Last 4 digits processed")
     email: str = Field(..., description="Email address")
     message: str = Field(..., description="Human-readable status message")
-    pdf_path: Optional[str] = Field(None, description="Path to downloaded PDF file")
-    pdf_base64: Optional[str] = Field(None, description="Base64-encoded PDF content for Power Automate")
+    pdf_url: Optional[str] = Field(None, description="Relative URL to fetch the PDF from /download-pdf")
+    pdf_base64: Optional[str] = Field(None, description="Base64-encoded PDF content (only when encode_pdf is set)")
     pdf_available: bool = Field(False, description="Whether PDF was successfully downloaded")
     urls_visited: list = Field(default_factory=list, description="URLs visited during the process")
     processing_time_seconds: float = Field(0.0, description="Total processing time")
     success: bool = Field(True, description="Whether the operation was successful")
 
-async def process_clean_hands_request(notice: str, last4: str, email: str) -> CleanHandsResponse:
+def _pdf_file(response: CleanHandsResponse) -> Optional[Path]:
+    """On-disk PDF behind a response's pdf_url (responses never carry server paths)"""
+    return ARTIFACTS_DIR / Path(response.pdf_url).name if response.pdf_url else None
+
+def _is_valid_pdf(pdf_path: Path) -> bool:
+    """Cheap sanity check: %PDF- magic bytes up front and no HTML error page at the end"""
+    try:
+        with open(pdf_path, "rb") as f:
+            if f.read(5) != b"%PDF-":
+                return False
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 1024))
+            return b"</html>" not in f.read().lower()
+    except OSError:
+        return False
+
+# Result cache: (notice, last4) -> (expires_at, response stored without email/base64).
+# Noncompliant results get a shorter TTL; unknown/error results are never cached.
+# An in-memory dict sits in front of a SQLite file, so cached results survive restarts
+# and are shared by every worker process. The file holds notice/last4 pairs, so it must
+# live outside ARTIFACTS_DIR, which /download-pdf serves.
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "300"))
+NEGATIVE_CACHE_TTL = int(os.getenv("NEGATIVE_CACHE_TTL", "60"))
+RESULT_CACHE_MAXSIZE = 1024
+RESULT_CACHE_DB = Path(os.getenv("CACHE_DB_PATH") or Path(__file__).parent / ".cache" / "result_cache.sqlite3")
+RESULT_CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+_result_cache: Dict[Tuple[str, str], Tuple[float, CleanHandsResponse]] = {}
+
+def _cache_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(RESULT_CACHE_DB, timeout=5)
+    conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires_at REAL, response BLOB)")
+    return conn
+
+def _disk_cache_get(key: str) -> Optional[Tuple[float, bytes]]:
+    """Blocking SQLite lookup; run it off the event loop"""
+    with closing(_cache_db()) as conn:
+        return conn.execute(
+            "SELECT expires_at, response FROM results WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+
+def _disk_cache_put(key: str, expires_at: float, response: bytes) -> None:
+    """Blocking SQLite upsert (also drops expired rows); run it off the event loop"""
+    with closing(_cache_db()) as conn, conn:
+        conn.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+        conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, expires_at, response))
+
+def _disk_cache_clear() -> int:
+    with closing(_cache_db()) as conn, conn:
+        return conn.execute("DELETE FROM results").rowcount
+
+def _memory_cache_put(key: Tuple[str, str], expires_at: float, response: CleanHandsResponse) -> None:
+    _result_cache.pop(key, None)
+    if len(_result_cache) >= RESULT_CACHE_MAXSIZE:
+        # Dicts keep insertion order, so the first key is the oldest entry
+        _result_cache.pop(next(iter(_result_cache)))
+    _result_cache[key] = (expires_at, response)
+
+async def _cache_get(key: Tuple[str, str]) -> Optional[CleanHandsResponse]:
+    """Cached response for key, if unexpired and its PDF (if any) is still on disk"""
+    entry = _result_cache.get(key)
+    if entry is None:
+        try:
+            row = await asyncio.to_thread(_disk_cache_get, ":".join(key))
+            if row is None:
+                return None
+            # Rows written by an older response shape fail validation and count as a miss
+            entry = (row[0], CleanHandsResponse.model_validate_json(row[1]))
+        except Exception as e:
+            logger.warning(f"⚠️ Result cache read failed: {e}")
+            return None
+        _memory_cache_put(key, *entry)
+    expires_at, response = entry
+    pdf_file = _pdf_file(response)
+    if expires_at < time.time() or (pdf_file and not pdf_file.exists()):
+        _result_cache.pop(key, None)
+        return None
+    return response
+
+async def _cache_put(key: Tuple[str, str], response: CleanHandsResponse) -> None:
+    if not response.success:
+        return
+    if response.status == "compliant":
+        ttl = RESULT_CACHE_TTL
+    elif response.status == "noncompliant":
+        ttl = NEGATIVE_CACHE_TTL
+    else:
+        return
+    expires_at = time.time() + ttl
+    stored = response.model_copy(update={"email": "", "pdf_base64": None})
+    _memory_cache_put(key, expires_at, stored)
+    try:
+        await asyncio.to_thread(_disk_cache_put, ":".join(key), expires_at, stored.model_dump_json())
+    except Exception as e:
+        logger.warning(f"⚠️ Result cache write failed: {e}")
+
+# Multiple of 3, so per-chunk base64 output concatenates without padding in between
+_B64_CHUNK_SIZE = 3 * 21_845  # ~64 KB
+
+def _read_pdf_base64(pdf_path: Path) -> str:
+    """Read and base64-encode a PDF in ~64 KB chunks (blocking; run it off the event loop)"""
+    parts = []
+    with open(pdf_path, "rb") as f:
+        while chunk := f.read(_B64_CHUNK_SIZE):
+            parts.append(base64.b64encode(chunk))
+    return b"".join(parts).decode("ascii")
+
+async def _for_caller(shared: CleanHandsResponse, email: str, encode_pdf: bool, start_time: int) -> CleanHandsResponse:
+    """Copy of a cached/shared response with this caller's email and base64 choice"""
+    pdf_base64 = shared.pdf_base64 if encode_pdf else None
+    pdf_file = _pdf_file(shared)
+    if encode_pdf and pdf_base64 is None and pdf_file and pdf_file.exists():
+        pdf_base64 = await asyncio.to_thread(_read_pdf_base64, pdf_file)
+    return shared.model_copy(update={
+        "email": email,
+        "pdf_base64": pdf_base64,
+        "processing_time_seconds": round(_elapsed_seconds(start_time), 2)
+    })
+
+# In-flight workflow runs, so concurrent identical requests share one browser run.
+# Each run is a detached task: a caller that disconnects cancels only its own wait.
+_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+async def _run_shared(cache_key: Tuple[str, str], notice: str, last4: str, email: str,
+                      encode_pdf: bool, start_time: int) -> CleanHandsResponse:
+    """The shared run behind _inflight: workflow, then cache the result"""
+    response = await _run_clean_hands_workflow(notice, last4, email, encode_pdf, start_time)
+    await _cache_put(cache_key, response)
+    return response
+
+def _forget_inflight(cache_key: Tuple[str, str], task: asyncio.Task) -> None:
+    if _inflight.get(cache_key) is task:
+        _inflight.pop(cache_key, None)
+
+async def process_clean_hands_request(notice: str, last4: str, email: str, encode_pdf: bool = False) -> CleanHandsResponse:
     """Process a Clean Hands request using our proven workflow"""
     
     if not WORKFLOW_AVAILABLE:
@@ -70,55 +319,103 @@ async def process_clean_hands_request(notice: str, last4: str, email: str) -> Cl
     
     logger.info(f"🚀 Processing request - Notice: {notice}, Last4: {last4}, Email: {email}")
     
-    import time
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
+    cache_key = (notice, last4)
+    
+    cached = await _cache_get(cache_key)
+    if cached is not None:
+        logger.info(f"♻️ Returning cached result - Notice: {notice}, Status: {cached.status}")
+        return await _for_caller(cached, email, encode_pdf, start_time)
+    
+    # Singleflight: start the run for this notice/last4, or join the one in progress.
+    # Check-and-insert has no await in between, so no lock is needed.
+    inflight = _inflight.get(cache_key)
+    if inflight is None:
+        inflight = asyncio.create_task(_run_shared(cache_key, notice, last4, email, encode_pdf, start_time))
+        _inflight[cache_key] = inflight
+        inflight.add_done_callback(functools.partial(_forget_inflight, cache_key))
+    else:
+        logger.info(f"⏳ Joining in-flight run - Notice: {notice}")
+    # Shielded, so cancelling one caller (e.g. a client disconnect) leaves the run and
+    # every other caller waiting on it untouched
+    shared = await asyncio.shield(inflight)
+    return await _for_caller(shared, email, encode_pdf, start_time)
+
+async def _run_clean_hands_workflow(notice: str, last4: str, email: str, encode_pdf: bool, start_time: int) -> CleanHandsResponse:
+    """Run the browser workflow once and build the response"""
+    global _running_workflows
     
     try:
-        # Run the proven workflow (headless, no screenshots, model_name ignored)
-        result: WorkflowResult = await run_workflow(
-            notice=notice,
-            last4=last4,
-            headless=True,  # Always headless for API
-            screenshots=False,  # No screenshots for API
-            model_name="api"  # Not used in deterministic workflow
-        )
+        # Reuse the browser launched at startup (relaunched here only if it crashed)
+        browser = app.state.browser
+        if browser is None or not browser.is_connected():
+            browser = app.state.browser = await get_shared_browser(headless=HEADLESS)
+
+        # Run the proven workflow in a pooled context;
+        # extra requests queue here instead of opening more contexts
+        async with WORKFLOW_SEM:
+            _running_workflows += 1
+            try:
+                context, uses = await _acquire_context(browser)
+                reusable = False
+                try:
+                    result: WorkflowResult = await RUN_WORKFLOW(context, notice=notice, last4=last4)
+                    reusable = True
+                finally:
+                    await _release_context(context, uses + 1, reusable)
+            finally:
+                _running_workflows -= 1
         
-        processing_time = time.time() - start_time
+        processing_time = _elapsed_seconds(start_time)
         
-        # Prepare PDF data for Power Automate
+        # Prepare PDF data for Power Automate: a download URL by default,
+        # inline base64 only when the caller asks for it
+        pdf_path = Path(result.pdf_path) if result.pdf_path else None
+        pdf_url = None
         pdf_base64 = None
         pdf_available = False
+        status = result.status
+        message = result.message
+        success = True
         
-        if result.pdf_path and Path(result.pdf_path).exists():
-            try:
-                with open(result.pdf_path, "rb") as f:
-                    pdf_content = f.read()
-                    pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
-                    pdf_available = True
-                logger.info(f"✅ PDF encoded for Power Automate: {len(pdf_content)} bytes")
-            except Exception as e:
-                logger.error(f"❌ Failed to encode PDF: {e}")
+        if pdf_path and pdf_path.exists():
+            if await asyncio.to_thread(_is_valid_pdf, pdf_path):
+                pdf_url = f"/download-pdf/{pdf_path.name}"
+                pdf_available = True
+                if encode_pdf:
+                    try:
+                        pdf_base64 = await asyncio.to_thread(_read_pdf_base64, pdf_path)
+                        logger.info(f"✅ PDF encoded for Power Automate: {len(pdf_base64)} base64 chars")
+                    except Exception as e:
+                        logger.error(f"❌ Failed to encode PDF: {e}")
+            else:
+                # An HTML error page or truncated body saved as .pdf; don't encode or serve it
+                logger.error(f"❌ Downloaded file is not a valid PDF: {pdf_path}")
+                pdf_path.unlink(missing_ok=True)
+                status = "error"
+                message = "Downloaded certificate was not a valid PDF"
+                success = False
         
         # Create response
         response = CleanHandsResponse(
-            status=result.status,
+            status=status,
             notice=result.notice,
             last4=result.last4,
             email=email,
-            message=result.message,
-            pdf_path=result.pdf_path,
+            message=message,
+            pdf_url=pdf_url,
             pdf_base64=pdf_base64,
             pdf_available=pdf_available,
             urls_visited=result.urls,
             processing_time_seconds=round(processing_time, 2),
-            success=True
+            success=success
         )
         
-        logger.info(f"✅ Request completed successfully in {processing_time:.2f}s - Status: {result.status}")
+        logger.info(f"✅ Request completed in {processing_time:.2f}s - Status: {status}")
         return response
         
     except Exception as e:
-        processing_time = time.time() - start_time
+        processing_time = _elapsed_seconds(start_time)
         logger.error(f"❌ Request failed after {processing_time:.2f}s: {str(e)}")
         
         # Return error response
@@ -128,7 +425,6 @@ async def process_clean_hands_request(notice: str, last4: str, email: str) -> Cl
             last4=last4,
             email=email,
             message=f"Processing failed: {str(e)}",
-            pdf_path=None,
             pdf_base64=None,
             pdf_available=False,
             urls_visited=[],
@@ -146,6 +442,8 @@ async def root():
         "endpoints": {
             "health": "/health",
             "check_certificate": "/check-clean-hands",
+            "check_certificate_async": "/check-clean-hands-async",
+            "job_status": "/jobs/{job_id}",
             "download_pdf": "/download-pdf/{filename}"
         },
         "workflow_available": WORKFLOW_AVAILABLE,
@@ -155,7 +453,8 @@ async def root():
             "body": {
                 "notice": "L0012322733",
                 "last4": "3283", 
-                "email": "user@example.com"
+                "email": "user@example.com",
+                "encode_pdf": False
             }
         }
     }
@@ -167,7 +466,10 @@ async def health():
         "status": "healthy",
         "workflow_available": WORKFLOW_AVAILABLE,
         "artifacts_dir": str(ARTIFACTS_DIR),
-        "artifacts_exists": ARTIFACTS_DIR.exists()
+        "artifacts_exists": ARTIFACTS_DIR.exists(),
+        "max_concurrency": MAX_CONCURRENCY,
+        "running_workflows": _running_workflows,
+        "available_slots": MAX_CONCURRENCY - _running_workflows
     }
 
 @app.post("/check-clean-hands", response_model=CleanHandsResponse)
@@ -177,7 +479,7 @@ async def check_clean_hands(request: CleanHandsRequest):
     
     Processes a DC Clean Hands certificate check request and returns:
     - Compliance status (compliant/noncompliant/unknown)
-    - PDF file as base64 (if available)
+    - PDF download URL, plus the file as base64 when encode_pdf is set
     - Processing details
     """
     
@@ -186,38 +488,173 @@ async def check_clean_hands(request: CleanHandsRequest):
     response = await process_clean_hands_request(
         notice=request.notice,
         last4=request.last4,
-        email=request.email
+        email=request.email,
+        encode_pdf=request.encode_pdf
     )
     
     return response
 
+# Background jobs for /check-clean-hands-async:
+# job_id -> {"status", "created", "finished", "result", "task"}
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))
+JOBS: Dict[str, dict] = {}
+
+def _prune_jobs() -> None:
+    """Forget jobs that finished more than JOB_TTL ago"""
+    cutoff = time.time() - JOB_TTL
+    for job_id in [j for j, job in JOBS.items() if job["status"] == "done" and job["finished"] < cutoff]:
+        JOBS.pop(job_id, None)
+
+def _finish_job(job_id: str, response: CleanHandsResponse) -> None:
+    job = JOBS.get(job_id)
+    if job is not None and job["status"] != "done":
+        job.update(status="done", finished=time.time(), result=response, task=None)
+
+async def _run_and_store(job_id: str, request: CleanHandsRequest) -> None:
+    """Background task: run the workflow and keep the response for polling"""
+    response = await process_clean_hands_request(
+        notice=request.notice,
+        last4=request.last4,
+        email=request.email,
+        encode_pdf=request.encode_pdf
+    )
+    _finish_job(job_id, response)
+
+def _on_job_done(job_id: str, request: CleanHandsRequest, task: asyncio.Task) -> None:
+    """Done callback: a cancelled or crashed job must still finish, or it stays pending forever"""
+    if task.cancelled():
+        message = "Processing was cancelled"
+    elif task.exception() is not None:
+        message = f"Processing failed: {task.exception()}"
+    else:
+        return
+    logger.error(f"❌ Job {job_id}: {message}")
+    _finish_job(job_id, CleanHandsResponse(
+        status="error",
+        notice=request.notice,
+        last4=request.last4,
+        email=request.email,
+        message=message,
+        success=False
+    ))
+
+@app.post("/check-clean-hands-async", status_code=202)
+async def check_clean_hands_async(request: CleanHandsRequest):
+    """
+    Long-running variant for Power Automate: returns 202 + job_id right away.
+    Poll the Location header (/jobs/{job_id}) until it answers 200 with the result.
+    """
+    if not WORKFLOW_AVAILABLE:
+        raise HTTPException(status_code=500, detail="DC Clean Hands workflow not available")
+    
+    _prune_jobs()
+    job_id = uuid.uuid4().hex
+    # The job entry holds the task, so it is not garbage-collected while running
+    task = asyncio.create_task(_run_and_store(job_id, request))
+    JOBS[job_id] = {"status": "pending", "created": time.time(), "finished": None, "result": None, "task": task}
+    task.add_done_callback(functools.partial(_on_job_done, job_id, request))
+    logger.info(f"🎯 Power Automate async request queued - Notice: {request.notice}, Job: {job_id}")
+    
+    status_url = f"/jobs/{job_id}"
+    return ORJSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "pending", "status_url": status_url},
+        headers={"Location": status_url, "Retry-After": "10"}
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Poll a background job: 202 while pending, 200 with the CleanHandsResponse when done"""
+    _prune_jobs()
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "done":
+        return ORJSONResponse(
+            status_code=202,
+            content={"job_id": job_id, "status": "pending"},
+            headers={"Location": f"/jobs/{job_id}", "Retry-After": "10"}
+        )
+    return {"job_id": job_id, "status": "done", "result": job["result"]}
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check: comma-separated tags, weak W/ prefixes ignored, * matches anything"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
 @app.get("/download-pdf/{filename}")
-async def download_pdf(filename: str):
-    """Download PDF file directly (alternative to base64)"""
+async def download_pdf(filename: str, request: Request):
+    """Download PDF file directly (alternative to base64); ETag + Range aware for retries"""
+    
+    # Only PDFs directly inside ARTIFACTS_DIR are downloadable
+    if not filename.lower().endswith(".pdf") or Path(filename).name != filename:
+        raise HTTPException(status_code=404, detail="PDF file not found")
     
     pdf_path = ARTIFACTS_DIR / filename
     
-    if not pdf_path.exists():
+    try:
+        st = pdf_path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="PDF file not found")
     
+    # Strong, quoted validator (RFC 9110): a change in mtime or size gives a new tag
+    etag = '"' + hashlib.blake2b(f"{st.st_mtime_ns}:{st.st_size}".encode()).hexdigest()[:16] + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=3600",  # certificates carry taxpayer data
+        "Accept-Ranges": "bytes"  # FileResponse serves Range requests (starlette>=0.39)
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
     return FileResponse(
         path=pdf_path,
         media_type="application/pdf",
-        filename=filename
+        filename=filename,
+        headers=headers,
+        stat_result=st
     )
 
+# Sorted PDF names in ARTIFACTS_DIR, reused until the directory's mtime changes
+_artifact_listing: Tuple[int, List[str]] = (-1, [])
+
+def _scan_pdf_names() -> List[str]:
+    """Blocking directory scan; run it off the event loop"""
+    with os.scandir(ARTIFACTS_DIR) as it:
+        return sorted(e.name for e in it if e.name.endswith(".pdf") and e.is_file())
+
+async def _sorted_pdf_names() -> List[str]:
+    global _artifact_listing
+    mtime_ns = ARTIFACTS_DIR.stat().st_mtime_ns
+    if _artifact_listing[0] != mtime_ns:
+        _artifact_listing = (mtime_ns, await asyncio.to_thread(_scan_pdf_names))
+    return _artifact_listing[1]
+
 @app.get("/list-artifacts")
-async def list_artifacts():
-    """List all available PDF artifacts"""
+async def list_artifacts(cursor: Optional[str] = None, limit: int = Query(200, ge=1, le=1000)):
+    """List available PDF artifacts, a page at a time (pass next_cursor back as cursor)"""
     
-    pdf_files = list(ARTIFACTS_DIR.glob("*.pdf"))
+    names = await _sorted_pdf_names()
+    start = bisect.bisect_right(names, cursor) if cursor else 0
+    page = names[start:start + limit]
     
     return {
         "artifacts_dir": str(ARTIFACTS_DIR),
-        "pdf_files": [f.name for f in pdf_files],
-        "total_files": len(pdf_files)
+        "pdf_files": page,
+        "total_files": len(names),
+        "next_cursor": page[-1] if start + limit < len(names) else None
     }
 
+@app.post("/cache/clear")
+async def clear_cache():
+    """Drop every cached (notice, last4) result"""
+    _result_cache.clear()
+    cleared = await asyncio.to_thread(_disk_cache_clear)
+    logger.info(f"🧹 Result cache cleared ({cleared} entries)")
+    return {"cleared": cleared}
+
 # For testing/development
 @app.post("/test-workflow")
 async def test_workflow():
@@ -235,4 +672,14 @@ if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "8000"))
     logger.info(f"🚀 Starting Power Automate API on port {port}")
-    uvicorn.run("power_automate_api:app", host="0.0.0.0", port=port, reload=True)
+    # uvloop/httptools have no Windows support; the file watcher only runs with DEV=1.
+    # Each worker process launches its own shared browser in lifespan.
+    uvicorn.run(
+        "power_automate_api:app",
+        host="0.0.0.0",
+        port=port,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        reload=DEV,
+        workers=int(os.getenv("WORKERS", "1"))
+    )
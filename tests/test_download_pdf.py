@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from download_pdf import RANGED_MIN_SIZE, download_pdf, download_pdf_async
+
+
+class _TruncatingHandler(BaseHTTPRequestHandler):
+    """Advertises the full Content-Length, then closes the socket mid-body."""
+    protocol_version = "HTTP/1.1"
+    full_size = 0
+
+    def do_GET(self):
+        body = b"%PDF-1.4\n" + b"x" * (self.full_size - 9)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(self.full_size))
+        self.end_headers()
+        self.wfile.write(body[: self.full_size // 2])
+        self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class _RangeIgnoringHandler(BaseHTTPRequestHandler):
+    """Advertises Accept-Ranges: bytes but always answers 200 with the whole body."""
+    protocol_version = "HTTP/1.1"
+    body = b"%PDF-1.4\n" + bytes(range(256)) * (RANGED_MIN_SIZE // 256 + 1)
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        try:
+            self.wfile.write(self.body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # a sniffing or ranged client may hang up early
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(test, handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return f"http://127.0.0.1:{server.server_address[1]}/doc.pdf"
+
+
+class TruncatedDownloadTest(unittest.TestCase):
+    def _serve(self, full_size):
+        return _serve(self, type("Handler", (_TruncatingHandler,), {"full_size": full_size}))
+
+    def _assert_no_file_left(self, full_size):
+        url = self._serve(full_size)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "doc.pdf")
+            with requests.Session() as session:
+                self.assertFalse(download_pdf(url, out, timeout=5, session=session))
+            self.assertFalse(os.path.exists(out))
+
+    def test_small_body_closed_early(self):
+        self._assert_no_file_left(64 * 1024)
+
+    def test_large_body_closed_early(self):
+        # Above SMALL_BODY_MAX, so the output is preallocated/mapped to full size first
+        self._assert_no_file_left(3 * 1024 * 1024 + 9)
+
+
+class IgnoredRangeTest(unittest.TestCase):
+    def test_falls_back_to_single_stream(self):
+        url = _serve(self, _RangeIgnoringHandler)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "doc.pdf")
+            with requests.Session() as session:
+                self.assertTrue(download_pdf(url, out, timeout=5, session=session))
+            with open(out, "rb") as f:
+                self.assertEqual(f.read(), _RangeIgnoringHandler.body)
+
+
+class AsyncChecksumTest(unittest.TestCase):
+    def _download(self, verify_sha256):
+        url = _serve(self, _RangeIgnoringHandler)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "doc.pdf")
+            with requests.Session() as session:
+                ok = asyncio.run(download_pdf_async(url, out, timeout=5, session=session,
+                                                    verify_sha256=verify_sha256))
+            return ok, os.path.exists(out)
+
+    def test_matching_checksum(self):
+        self.assertEqual(self._download(hashlib.sha256(_RangeIgnoringHandler.body).hexdigest()), (True, True))
+
+    def test_mismatched_checksum_is_forwarded(self):
+        self.assertEqual(self._download("0" * 64), (False, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
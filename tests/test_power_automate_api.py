@@ -0,0 +1,222 @@
+import asyncio
+import importlib.util
+import os
+import tempfile
+import time
+import unittest
+from contextlib import closing
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+_MISSING = [m for m in ("fastapi", "httpx", "prometheus_client", "dotenv", "email_validator")
+            if importlib.util.find_spec(m) is None]
+_skip = unittest.skipIf(_MISSING, f"needs {', '.join(_MISSING)}")
+
+# The result cache DB path is read at import time, so point it somewhere disposable first
+_TMP = tempfile.TemporaryDirectory()
+os.environ["CACHE_DB_PATH"] = os.path.join(_TMP.name, "result_cache.sqlite3")
+
+if not _MISSING:
+    from fastapi.testclient import TestClient
+
+    import power_automate_api as api
+
+_PDF = b"%PDF-1.4\n" + b"x" * 2048 + b"\n%%EOF\n"
+
+
+class _FakeWorkflow:
+    """Stands in for RUN_WORKFLOW; blocks until `release` is set and counts its runs."""
+
+    def __init__(self, status="noncompliant"):
+        self.status = status
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, context, notice, last4):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        return SimpleNamespace(status=self.status, message="stub", pdf_path=None, urls=[],
+                               notice=notice, last4=last4)
+
+
+class _ApiTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.workflow = _FakeWorkflow()
+        browser = SimpleNamespace(is_connected=lambda: True)
+
+        async def acquire(browser):
+            return object(), 0
+
+        async def release(context, uses, reusable=True):
+            pass
+
+        for name, value in (
+            ("WORKFLOW_AVAILABLE", True),
+            ("RUN_WORKFLOW", self.workflow),
+            ("WORKFLOW_SEM", asyncio.Semaphore(4)),
+            ("_acquire_context", acquire),
+            ("_release_context", release),
+        ):
+            patcher = mock.patch.object(api, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(api.app.state, "browser", browser, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for store in (api._result_cache, api._inflight, api.JOBS):
+            patcher = mock.patch.dict(store, clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        api._disk_cache_clear()
+
+    def _request(self, email="a@example.com"):
+        return api.process_clean_hands_request("L0012322733", "3283", email)
+
+
+@_skip
+class ResultCacheTest(_ApiTestCase):
+    async def test_repeat_request_is_served_from_cache(self):
+        await self._request()
+        await self._request()
+        self.assertEqual(self.workflow.calls, 1)
+
+    async def test_sqlite_hit_after_memory_is_lost(self):
+        await self._request()
+        api._result_cache.clear()  # e.g. a restart or another worker
+        response = await self._request(email="b@example.com")
+        self.assertEqual(self.workflow.calls, 1)
+        self.assertEqual(response.email, "b@example.com")
+
+    async def test_expired_entry_is_rerun(self):
+        await self._request()
+        api._result_cache.clear()
+        with closing(api._cache_db()) as conn, conn:
+            conn.execute("UPDATE results SET expires_at = ?", (time.time() - 1,))
+        await self._request()
+        self.assertEqual(self.workflow.calls, 2)
+
+
+@_skip
+class SingleflightTest(_ApiTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.workflow.release.clear()
+
+        async def miss(key):
+            return None
+
+        # A cache lookup that never leaves the loop, so every caller reaches _inflight in one step
+        patcher = mock.patch.object(api, "_cache_get", miss)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_concurrent_requests_share_one_run(self):
+        callers = [asyncio.create_task(self._request(email=f"{i}@example.com")) for i in range(3)]
+        await self.workflow.started.wait()
+        self.workflow.release.set()
+        responses = await asyncio.gather(*callers)
+        self.assertEqual(self.workflow.calls, 1)
+        self.assertEqual([r.email for r in responses], [f"{i}@example.com" for i in range(3)])
+        self.assertEqual(api._inflight, {})
+
+    async def test_cancelled_leader_leaves_the_run_to_others(self):
+        leader = asyncio.create_task(self._request())
+        follower = asyncio.create_task(self._request(email="b@example.com"))
+        await self.workflow.started.wait()
+        leader.cancel()
+        self.workflow.release.set()
+        response = await follower
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual(self.workflow.calls, 1)
+        self.assertTrue(response.success)
+
+
+@_skip
+class JobTest(_ApiTestCase):
+    async def test_cancelled_job_still_finishes(self):
+        self.workflow.release.clear()
+        request = api.CleanHandsRequest(notice="L0012322733", last4="3283", email="a@example.com")
+        await api.check_clean_hands_async(request)
+        (job_id, job), = api.JOBS.items()
+        await self.workflow.started.wait()
+        job["task"].cancel()
+        await asyncio.gather(job["task"], return_exceptions=True)
+        self.assertEqual(job["status"], "done")
+        self.assertFalse(job["result"].success)
+        # The shared run was only detached from the job, not cancelled
+        self.workflow.release.set()
+        await asyncio.gather(*api._inflight.values())
+
+
+@_skip
+class EndpointTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.artifacts = Path(tmp.name) / "artifacts"
+        self.artifacts.mkdir()
+        for name, value in (("ARTIFACTS_DIR", self.artifacts), ("_artifact_listing", (-1, []))):
+            patcher = mock.patch.object(api, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(api.JOBS, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # No `with` block: lifespan (the shared browser launch) is not run
+        self.client = TestClient(api.app)
+
+    def _done_job(self, finished):
+        result = api.CleanHandsResponse(status="noncompliant", notice="L0012322733", last4="3283",
+                                        email="a@example.com", message="stub")
+        return {"status": "done", "created": finished, "finished": finished, "result": result, "task": None}
+
+    def test_finished_jobs_expire_after_ttl(self):
+        api.JOBS["old"] = self._done_job(time.time() - api.JOB_TTL - 1)
+        api.JOBS["new"] = self._done_job(time.time())
+        self.assertEqual(self.client.get("/jobs/old").status_code, 404)
+        self.assertEqual(self.client.get("/jobs/new").status_code, 200)
+        self.assertNotIn("old", api.JOBS)
+
+    def test_download_revalidates_with_etag(self):
+        (self.artifacts / "cert.pdf").write_bytes(_PDF)
+        first = self.client.get("/download-pdf/cert.pdf")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, _PDF)
+        etag = first.headers["etag"]
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+        for header in (etag, f'"other", W/{etag}', "*"):
+            again = self.client.get("/download-pdf/cert.pdf", headers={"If-None-Match": header})
+            self.assertEqual(again.status_code, 304, header)
+        other = self.client.get("/download-pdf/cert.pdf", headers={"If-None-Match": '"other"'})
+        self.assertEqual(other.status_code, 200)
+
+    def test_download_only_serves_pdfs_inside_artifacts(self):
+        (self.artifacts / "notes.txt").write_text("not a pdf")
+        (self.artifacts.parent / "outside.pdf").write_bytes(_PDF)
+        for path in ("/download-pdf/notes.txt", "/download-pdf/..%2Foutside.pdf", "/download-pdf/missing.pdf"):
+            self.assertEqual(self.client.get(path).status_code, 404, path)
+
+    def test_list_artifacts_pages_with_cursor(self):
+        names = [f"clean-hands-{i}.pdf" for i in range(5)]
+        for name in names:
+            (self.artifacts / name).write_bytes(_PDF)
+        (self.artifacts / "notes.txt").write_text("skipped")
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            page = self.client.get("/list-artifacts", params=params).json()
+            self.assertEqual(page["total_files"], 5)
+            seen += page["pdf_files"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(names))
+
+
+if __name__ == "__main__":
+    unittest.main()